@@ -7,6 +7,10 @@ class IllegalMacroNameError(Exception):
     """Raised if a macro name with less or more than three parts is given."""
     pass
 
+class UsageError(Exception):
+    """Raised if a command's arguments don't fit together."""
+    pass
+
 
 # Parse
 
@@ -34,6 +38,10 @@ def add_source_file_arg(parser, mode='read'):
         help="The name of the file which contains the source code. "
              "Defaults to {0}.".format(default_name))
 
+def add_index_arg(parser):
+    parser.add_argument('--index', metavar='FILE',
+        help="The index file.  Defaults to a per-user cache file.")
+
 
 def ArgumentParser():
     """Build a parser for the command line.
@@ -51,6 +59,33 @@ def ArgumentParser():
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument('--host', default='localhost')
     parser.add_argument('-p', '--port', default='2002')
+    parser.add_argument('--pipe', metavar='NAME',
+        help="Connect through the named pipe instead of --host and --port, "
+             "e.g. for an office started with "
+             "--accept='pipe,name=NAME;urp;'.")
+    parser.add_argument('--url',
+        help="Connect to this UNO URL, e.g. "
+             "'uno:socket,host=localhost,port=2002;urp;"
+             "StarOffice.ComponentContext'.")
+    parser.add_argument('--socket',
+        help="The Unix socket of an `oomax daemon`.  "
+             "Defaults to a per-user path derived from the host and port.")
+    parser.add_argument('--no-daemon', action='store_true',
+        help="Connect directly even if a daemon is running.")
+    parser.add_argument('--targets', metavar='HOST:PORT,...',
+        help="Run push, pull or invoke against each of these instances "
+             "in parallel instead of --host and --port.")
+    parser.add_argument('-j', '--jobs', type=int, default=8,
+        help="With --targets, the most instances to work on at once.  "
+             "Defaults to %(default)s.")
+    parser.add_argument('--timeout', type=float,
+        help="With --targets, the seconds to allow each instance.")
+    parser.add_argument('--profile', action='store_true',
+        help="Print the time spent in each phase and remote call "
+             "to standard error.  Implies --no-daemon.")
+    parser.add_argument('--profile-json', metavar='FILE',
+        type=argparse.FileType('w'),
+        help="Write the --profile data to FILE as JSON.")
 
     commands = parser.add_subparsers(dest='command')
 
@@ -62,6 +97,16 @@ def ArgumentParser():
     add_macro_arg(push_command)
     add_source_file_arg(push_command, 'read')
 
+    push_all_command = commands.add_parser(
+        'push-all', help="Push code to the given module "
+                         "of every open document.")
+    push_all_command.add_argument('-s', '--save', action='store_true',
+        help="Save each document after updating the macro module.")
+    push_all_command.add_argument('--match', metavar='GLOB', default='*',
+        help="Only push to documents whose names match GLOB.")
+    add_macro_arg(push_all_command)
+    add_source_file_arg(push_all_command, 'read')
+
     pull_command = commands.add_parser(
         'pull', help="Pull code from the given module.")
     add_document_arg(pull_command)
@@ -74,6 +119,110 @@ def ArgumentParser():
     add_macro_arg(invoke_command,
         help="The fully-qualified macro name, e.g. 'Standard.Module1.main'")
 
+    invoke_many_command = commands.add_parser(
+        'invoke-many', help="Invoke a stream of macros over one connection.",
+        description="Each line of input is a JSON object "
+                    "with a 'macro' name, optional 'args' list, "
+                    "and a 'document' unless --document is given.  "
+                    "A JSON result line is written for each.")
+    invoke_many_command.add_argument('-d', '--document',
+        help="The document for lines which don't name one.")
+    add_source_file_arg(invoke_many_command, 'read')
+
+    batch_command = commands.add_parser(
+        'batch', help="Run a stream of push, pull and invoke commands "
+                      "over one connection.",
+        description="Each line of input is a JSON object with a 'command' "
+                    "of push, pull or invoke, a 'macro' name, "
+                    "and a 'document' unless --document is given.  "
+                    "A JSON result line is written for each "
+                    "as soon as it has run.")
+    batch_command.add_argument('-d', '--document',
+        help="The document for lines which don't name one.")
+    add_source_file_arg(batch_command, 'read')
+
+    bench_command = commands.add_parser(
+        'bench', help="Time repeated invocations of a macro.")
+    add_document_arg(bench_command)
+    add_macro_arg(bench_command,
+        help="The fully-qualified macro name, e.g. 'Standard.Module1.main'")
+    bench_command.add_argument('-n', '--iterations', type=int, default=100,
+        help="Timed invocations per macro.  Defaults to %(default)s.")
+    bench_command.add_argument('-w', '--warmup', type=int, default=5,
+        help="Untimed invocations first.  Defaults to %(default)s.")
+    bench_command.add_argument('--args', default='[]',
+        help="A JSON list of arguments to pass to the macro.")
+    bench_command.add_argument('--compare', metavar='MACRO', action='append',
+        default=[], help="Also time this macro.  May be repeated.")
+    bench_command.add_argument('--versions', metavar='FILE', nargs='+',
+        help="Time the macro with each of these files pushed as its module, "
+             "then restore the module.")
+
+    sync_command = commands.add_parser(
+        'sync', help="Push or pull a whole tree of Library/Module.bas files.")
+    sync_command.add_argument('direction', choices=('push', 'pull'))
+    sync_command.add_argument('-s', '--save', action='store_true',
+        help="Save the document after pushing.")
+    sync_command.add_argument('-i', '--incremental', action='store_true',
+        help="Only push modules which have changed since they were "
+             "last pushed with this option.")
+    sync_command.add_argument('--verify', action='store_true',
+        help="With --incremental, also push modules whose text "
+             "in the document no longer matches what was last pushed.")
+    add_document_arg(sync_command)
+    sync_command.add_argument('directory',
+        help="The directory containing one subdirectory per library.")
+
+    watch_command = commands.add_parser(
+        'watch', help="Push modules in a Library/Module.bas tree "
+                      "whenever their files change.")
+    watch_command.add_argument('-s', '--save', action='store_true',
+        help="Save the document after each batch of changes.")
+    watch_command.add_argument('--delay', type=float, default=0.2,
+        help="Seconds to wait for further changes before pushing a batch.")
+    add_document_arg(watch_command)
+    watch_command.add_argument('directory',
+        help="The directory containing one subdirectory per library.")
+
+    index_command = commands.add_parser(
+        'index', help="Index the code of every open document "
+                      "for grep and where-defined.")
+    index_command.add_argument('--application', action='store_true',
+        help="Also index the application's own libraries.")
+    add_index_arg(index_command)
+
+    grep_command = commands.add_parser(
+        'grep', help="Search the indexed code without contacting the office.")
+    grep_command.add_argument('-i', '--ignore-case', action='store_true')
+    grep_command.add_argument('pattern', help="A Python regular expression.")
+    add_index_arg(grep_command)
+
+    where_defined_command = commands.add_parser(
+        'where-defined', help="Show where a Sub, Function or Property "
+                              "is defined, from the index.")
+    where_defined_command.add_argument('name')
+    add_index_arg(where_defined_command)
+
+    snapshot_command = commands.add_parser(
+        'snapshot', help="Save every module of a document to an archive.")
+    add_document_arg(snapshot_command)
+    snapshot_command.add_argument('archive',
+        help="The archive file to write, e.g. 'template.oomax'.")
+
+    restore_command = commands.add_parser(
+        'restore', help="Put the modules from a snapshot archive "
+                        "into a document.")
+    restore_command.add_argument('-s', '--save', action='store_true',
+        help="Save the document after restoring.")
+    restore_command.add_argument('--changed-only', action='store_true',
+        help="Only write modules whose text differs from the archive's.")
+    add_document_arg(restore_command)
+    restore_command.add_argument('archive',
+        help="The archive file written by `oomax snapshot`.")
+
+    commands.add_parser(
+        'daemon', help="Keep a connection open and serve other oomax calls.")
+
     return parser, commands.choices
 
 
@@ -98,18 +247,41 @@ def split_macro_name(command, macro_name):
         # take the unparsed macro name.
         return [macro_name]
 
+def socket_path(options):
+    from daemon import default_socket_path
+    return options.socket or default_socket_path(
+        options.host, options.port, pipe=options.pipe, url=options.url)
+
+def get_exchange(options):
+    """Returns a client of a running daemon, or else a new `Exchange`."""
+    if not (options.no_daemon or options.recorder):
+        from daemon import connect_client
+        client = connect_client(socket_path(options))
+        if client is not None:
+            return client
+    return new_exchange(options)
+
+def new_exchange(options):
+    """Returns a new `Exchange` connected as directed by `options`."""
+    import find_ooo, instrument
+    recorder = options.recorder or instrument.null_recorder
+    with recorder.phase('import'):
+        from exchange import Exchange
+    # Looked up now rather than bound as a default argument,
+    # so that replacing `find_ooo.find_uno` before calling `main`,
+    # as the startup benchmark does with a fake office, takes effect.
+    return Exchange(host=options.host, port=options.port,
+                    find_uno=find_ooo.find_uno, recorder=recorder,
+                    pipe=options.pipe, url=options.url)
+
 def take_action(options):
     """Takes the action prescribed by `options.command`.
 
-    The command name is mapped directly to a method of `exchange.Exchange`.
+    The command name is mapped directly to a method of `exchange.Exchange`,
+    or of a `daemon.DaemonClient` if a daemon is running.
 
     See `parse_args` for option details.
     """
-    from exchange import Exchange
-
-    action = getattr(Exchange(host=options.host, port=options.port),
-                     options.command)
-
     args = [options.document] + split_macro_name(options.command,
                                                  options.macro)
     kwargs = {}
@@ -118,10 +290,279 @@ def take_action(options):
         args.append(options.source_file)
         kwargs.update(save=options.save)
 
-    result = action(*args, **kwargs)
+    if options.targets:
+        return take_action_on_targets(options, args, kwargs)
+
+    exchange = get_exchange(options)
+    if options.command == 'pull':
+        from sources import write_source
+        write_source(exchange.pull_text(*args), options.source_file)
+        return
+
+    getattr(exchange, options.command)(*args, **kwargs)
+
+def run_push_all(options):
+    """Pushes to every open document matching `options.match`.
+
+    A line for each document is written to standard error.
+    Returns 1 if any document failed.
+    """
+    from sys import stderr
+
+    library_name, module_name = split_macro_name('push', options.macro)
+    results = new_exchange(options).push_all(
+        library_name, module_name, options.source_file, match=options.match,
+        save=options.save)
+
+    for result in results:
+        status = result.status
+        if result.error is not None:
+            status += ': {0}: {1}'.format(type(result.error).__name__,
+                                          result.error)
+        stderr.write('{0}\t{1:.1f} ms\t{2}\n'.format(
+            result.document, result.seconds * 1000, status))
+    if any(result.status == 'failed' for result in results):
+        return 1
+
+def take_action_on_targets(options, args, kwargs):
+    """Takes the action on each of `options.targets` in parallel.
+
+    Pulled code is written once per target, headed by the target's name.
+    A line for each target is written to standard error.
+
+    Returns 1 if any target failed.
+    """
+    from sys import stderr
+    import fanout
+
+    from sources import read_source, write_source
+
+    if options.command == 'push':
+        # Every target needs its own pass over the source.
+        args[-1] = read_source(args[-1])
+
+    def operation(exchange):
+        if options.command == 'pull':
+            return exchange.pull_text(*args)
+        getattr(exchange, options.command)(*args, **kwargs)
+
+    results = fanout.fan_out(fanout.parse_targets(options.targets,
+                                                  options.port),
+                             operation, max_workers=options.jobs,
+                             timeout=options.timeout)
 
     if options.command == 'pull':
-        options.source_file.writelines(line.rstrip('\n') + "\n" for line in result)
+        for result in results:
+            if result.error is None:
+                options.source_file.write(
+                    '==> {0} <==\n'.format(fanout.format_target(result.target)))
+                write_source(result.result, options.source_file)
+    stderr.writelines(fanout.format_results(results))
+    if any(result.error is not None for result in results):
+        return 1
+
+
+def run_daemon(options):
+    """Serves requests from other oomax processes until interrupted."""
+    from daemon import serve
+    serve(socket_path(options), host=options.host, port=options.port,
+          pipe=options.pipe, url=options.url)
+
+def run_bench(options):
+    """Times a macro, its variants, or versions of its module."""
+    import json
+    from sys import stdout
+    import macrobench
+
+    exchange = new_exchange(options)
+    settings = dict(iterations=options.iterations, warmup=options.warmup,
+                    args=json.loads(options.args))
+    if options.versions:
+        sources = []
+        for path in options.versions:
+            with open(path) as f:
+                sources.append((path, f.read()))
+        results = macrobench.bench_versions(exchange, options.document,
+                                            options.macro, sources, **settings)
+    else:
+        results = macrobench.bench_macros(exchange, options.document,
+                                          [options.macro] + options.compare,
+                                          **settings)
+    stdout.writelines(macrobench.format_results(results))
+
+def run_invoke_many(options):
+    """Invokes each macro in a JSONL stream, writing JSONL results.
+
+    Each result is written as soon as its call returns.
+    A line which can't be understood gets an error result of its own,
+    and the lines after it are still run.
+    Returns 1 if any call failed.
+    """
+    import json
+    from sys import stdout
+    from document import plain_value
+
+    def echo(request):
+        return dict((key, request[key])
+                    for key in ('id', 'document', 'macro')
+                    if isinstance(request, dict) and key in request)
+
+    failures = []
+    def write(response, error=None):
+        if error is not None:
+            response['error'] = '{0}: {1}'.format(type(error).__name__, error)
+            failures.append(response)
+        stdout.write(json.dumps(response) + '\n')
+        stdout.flush()
+
+    pending = []
+    def calls():
+        # Read line by line, rather than with the file's read-ahead,
+        # so that results come back while input is still arriving.
+        for line in iter(options.source_file.readline, ''):
+            if not line.strip():
+                continue
+            request = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("A call must be a JSON object.")
+                request.setdefault('document', options.document)
+                call = (request['document'], request['macro'],
+                        request.get('args', ()))
+            except Exception as e:
+                write(echo(request), e)
+                continue
+            pending.append(request)
+            yield call
+
+    exchange = new_exchange(options)
+    for result, error, seconds in exchange.invoke_many(calls()):
+        response = echo(pending.pop())
+        response['seconds'] = seconds
+        if error is None:
+            response['result'] = plain_value(result)
+        write(response, error)
+    if failures:
+        return 1
+
+def run_batch(options):
+    """Runs each command in a JSONL stream, writing JSONL results.
+
+    Returns 1 if any command failed.
+    """
+    import json
+    from sys import stdout
+    import stream
+
+    failed = False
+    exchange = new_exchange(options)
+    # Read line by line, rather than with the file's read-ahead,
+    # so that results come back while input is still arriving.
+    lines = iter(options.source_file.readline, '')
+    for result in stream.run_stream(exchange, lines, options.document):
+        failed = failed or result['status'] != 'ok'
+        stdout.write(json.dumps(result) + '\n')
+        stdout.flush()
+    if failed:
+        return 1
+
+def index_path(options):
+    from macroindex import default_path
+    return options.index or default_path()
+
+def run_index(options):
+    """Refreshes the index of the open documents' code."""
+    from sys import stdout, stderr
+    import macroindex
+
+    def report_error(doc_name, error):
+        stderr.write('{0}: {1}: {2}\n'.format(doc_name, type(error).__name__,
+                                              error))
+
+    counts = macroindex.build_index(new_exchange(options), index_path(options),
+                                    include_application=options.application,
+                                    report_error=report_error)
+    stdout.write('{added} added, {changed} changed, {unchanged} unchanged, '
+                 '{removed} removed\n'.format(**counts))
+
+def write_matches(matches):
+    """Writes index `matches`, returning 1 if there were none."""
+    from sys import stdout
+    from macroindex import format_match
+    found = False
+    for match in matches:
+        stdout.write(format_match(*match).encode('utf-8'))
+        found = True
+    if not found:
+        return 1
+
+def run_grep(options):
+    from macroindex import MacroIndex
+    index = MacroIndex(index_path(options))
+    return write_matches(index.grep(options.pattern, options.ignore_case))
+
+def run_where_defined(options):
+    from macroindex import MacroIndex
+    index = MacroIndex(index_path(options))
+    return write_matches(index.where_defined(options.name))
+
+def run_snapshot(options):
+    """Writes a document's modules to an archive."""
+    from sys import stdout
+    import snapshot
+    count = snapshot.take_snapshot(new_exchange(options), options.document,
+                                   options.archive)
+    stdout.write('{0} modules\n'.format(count))
+
+def run_restore(options):
+    """Restores a document's modules from an archive."""
+    from sys import stdout
+    import snapshot
+    restored = snapshot.restore_snapshot(new_exchange(options),
+                                         options.document, options.archive,
+                                         save=options.save,
+                                         only_changed=options.changed_only)
+    stdout.writelines('{0}.{1}\n'.format(*module) for module in restored)
+    stdout.write('{0} modules restored\n'.format(len(restored)))
+
+def run_sync(options):
+    """Pushes or pulls a whole tree over one connection."""
+    from sys import stdout
+    import sync
+    exchange = new_exchange(options)
+    if options.direction == 'push':
+        timings = sync.sync_push(exchange, options.document,
+                                 options.directory, save=options.save,
+                                 incremental=options.incremental,
+                                 verify=options.verify)
+    else:
+        timings = sync.sync_pull(exchange, options.document, options.directory)
+    stdout.writelines(sync.format_timings(timings))
+
+def run_watch(options):
+    """Pushes changed modules until interrupted."""
+    from sys import stdout
+    import sync, watch
+
+    def report(timings):
+        stdout.writelines(sync.format_timings(timings))
+        stdout.flush()
+
+    exchange = new_exchange(options)
+    try:
+        watch.watch(exchange, options.document, options.directory,
+                    save=options.save, delay=options.delay, report=report,
+                    reconnect=lambda: new_exchange(options))
+    except KeyboardInterrupt:
+        pass
+
+actions = {'batch': run_batch, 'bench': run_bench, 'daemon': run_daemon,
+           'grep': run_grep, 'index': run_index,
+           'invoke-many': run_invoke_many, 'push-all': run_push_all,
+           'restore': run_restore,
+           'snapshot': run_snapshot, 'sync': run_sync, 'watch': run_watch,
+           'where-defined': run_where_defined}
 
 
 # Main
@@ -133,13 +574,36 @@ def close_source(options):
     if hasattr(options, 'source_file'):
         options.source_file.close()
 
-def main():
+@contextmanager
+def profile(options):
+    """Sets `options.recorder`, and reports what it recorded on exit."""
+    options.recorder = None
+    if not (options.profile or options.profile_json):
+        yield options
+        return
+    from sys import stderr
+    from instrument import Recorder
+    options.recorder = Recorder()
+    try:
+        yield options
+    finally:
+        if options.profile:
+            stderr.writelines(options.recorder.format())
+        if options.profile_json:
+            options.recorder.dump(options.profile_json)
+            options.profile_json.close()
+
+def main(argv=None):
     parser, commands = ArgumentParser()
-    with close_source(parser.parse_args()) as options:
-        try:
-            take_action(options)
-        except IllegalMacroNameError as e:
-            commands[options.command].error(str(e))
+    with close_source(parser.parse_args(argv)) as options:
+        with profile(options):
+            try:
+                if options.targets and options.command in actions:
+                    raise UsageError("--targets only works with "
+                                     "push, pull and invoke.")
+                return actions.get(options.command, take_action)(options)
+            except (IllegalMacroNameError, UsageError) as e:
+                commands[options.command].error(str(e))
 
 
 # Clear out module-level imports
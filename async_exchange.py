@@ -0,0 +1,214 @@
+"""Non-blocking access to an `Exchange`, for event loops and orchestrators.
+
+An `AsyncExchange` owns an `Exchange` which lives on a dedicated thread;
+the UNO bridge isn't free-threaded,
+so every call on one connection is made from that thread, in order.
+Its methods return futures immediately.
+Use one `AsyncExchange` per office instance
+to have work on several instances in flight together.
+
+The futures are `concurrent.futures.Future` objects where that is available,
+so under asyncio, on Python 3,
+they can be awaited with `asyncio.wrap_future`,
+which `AsyncExchange.wrap` calls::
+
+    >>> remote = AsyncExchange(host='build1')
+    >>> await asyncio.wait_for(remote.wrap(remote.push(...)), timeout=30)
+    ... # doctest: +SKIP
+
+Calls which haven't started yet can be cancelled.
+A call already in progress on the bridge can't be interrupted;
+cancelling or timing out on its future just stops waiting for it.
+"""
+import threading
+from Queue import Queue
+
+import find_ooo
+from sources import read_source
+
+try:
+    from concurrent.futures import Future
+except ImportError:
+    class Future(object):
+        """The subset of `concurrent.futures.Future` used here."""
+        def __init__(self):
+            self._done = threading.Event()
+            self._cancelled = False
+            self._running = False
+            self._result = self._exception = None
+            self._callbacks = []
+            self._lock = threading.Lock()
+
+        def cancel(self):
+            with self._lock:
+                if self._running or self._done.is_set():
+                    return False
+                self._cancelled = True
+            self._finish()
+            return True
+
+        def cancelled(self):
+            return self._cancelled
+
+        def running(self):
+            return self._running and not self._done.is_set()
+
+        def done(self):
+            return self._done.is_set()
+
+        def set_running_or_notify_cancel(self):
+            with self._lock:
+                if self._cancelled:
+                    return False
+                self._running = True
+                return True
+
+        def set_result(self, result):
+            self._result = result
+            self._finish()
+
+        def set_exception(self, exception):
+            self._exception = exception
+            self._finish()
+
+        def _finish(self):
+            self._done.set()
+            for callback in self._callbacks:
+                callback(self)
+
+        def add_done_callback(self, callback):
+            if self._done.is_set():
+                callback(self)
+            else:
+                self._callbacks.append(callback)
+
+        def exception(self, timeout=None):
+            if not self._done.wait(timeout):
+                raise TimeoutError()
+            if self._cancelled:
+                raise CancelledError()
+            return self._exception
+
+        def result(self, timeout=None):
+            exception = self.exception(timeout)
+            if exception is not None:
+                raise exception
+            return self._result
+
+    class TimeoutError(Exception):
+        pass
+
+    class CancelledError(Exception):
+        pass
+else:
+    from concurrent.futures import TimeoutError, CancelledError
+
+
+class AsyncExchange(object):
+    """Runs `Exchange` operations on a thread of their own.
+
+    The arguments are those of `Exchange`;
+    the connection is made on the worker thread,
+    and any failure to connect is raised by the first call's future.
+    """
+    def __init__(self, host='localhost', port='2002',
+                       find_uno=find_ooo.find_uno, **kwargs):
+        self._connect_args = dict(host=host, port=port, find_uno=find_uno,
+                                  **kwargs)
+        self._queue = Queue()
+        self._exchange = None
+        self._thread = threading.Thread(
+            target=self._work, name='oomax {0}:{1}'.format(host, port))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, function = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self._exchange is None:
+                    from exchange import Exchange
+                    self._exchange = Exchange(**self._connect_args)
+                result = function(self._exchange)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, function):
+        """Calls `function` with the exchange on the worker thread.
+
+        Returns a future for its result.
+        """
+        if self._thread is None:
+            raise RuntimeError("AsyncExchange has been closed.")
+        future = Future()
+        self._queue.put((future, function))
+        return future
+
+    def invoke(self, doc_name, macro_name, args=()):
+        args = tuple(args)
+        return self.submit(lambda exchange:
+            exchange.invoke(doc_name, macro_name, args))
+
+    def invoke_many(self, calls):
+        """Returns a future for the list of `Exchange.invoke_many` results.
+
+        `calls` is read now, not on the worker thread.
+        """
+        calls = [(doc_name, macro_name, tuple(args))
+                 for doc_name, macro_name, args in calls]
+        return self.submit(lambda exchange:
+            list(exchange.invoke_many(calls)))
+
+    def push(self, doc_name, library_name, module_name, source, save=False):
+        """Returns a future which gives None once the module is pushed.
+
+        The document isn't passed back,
+        since it mustn't be used from other threads.
+        """
+        # Read the source now, while the caller still expects it to be read.
+        source = read_source(source)
+        def push(exchange):
+            exchange.push(doc_name, library_name, module_name, source,
+                          save=save)
+        return self.submit(push)
+
+    def pull(self, doc_name, library_name, module_name):
+        """Returns a future for the list of the module's lines."""
+        return self.submit(lambda exchange:
+            list(exchange.pull(doc_name, library_name, module_name)))
+
+    def push_modules(self, doc_name, modules, save=False):
+        modules = [(library_name, module_name, read_source(source))
+                   for library_name, module_name, source in modules]
+        return self.submit(lambda exchange:
+            exchange.push_modules(doc_name, modules, save=save))
+
+    def pull_modules(self, doc_name, library_names=None):
+        """Returns a future for the list of pulled modules."""
+        return self.submit(lambda exchange:
+            list(exchange.pull_modules(doc_name, library_names)))
+
+    @staticmethod
+    def wrap(future, loop=None):
+        """Returns an asyncio future which follows `future`.
+
+        Only works on Python 3, which has asyncio.
+        """
+        import asyncio
+        return asyncio.wrap_future(future, loop=loop)
+
+    def close(self, wait=True):
+        """Stops the worker thread once the queued calls are done."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+        self._thread = None
@@ -0,0 +1,352 @@
+"""Benchmarks of exchange operations against a `fake_uno.FakeOffice`.
+
+Each workload is run on a fresh office holding one document
+with the requested number of modules, among a few other documents.
+Connecting is done before timing starts.
+The wall time and the number of round trips to the office are reported;
+round trip counts don't depend on the machine,
+so they make a dependable regression check in CI.
+
+Run it with ::
+
+    $ python -m oomax.benchmark --sizes 1,100,1000 --latency 0.1
+
+``--json FILE`` saves the results,
+and ``--baseline FILE`` compares them against previously saved results,
+exiting with a non-zero status if any workload has regressed.
+``benchmark-baseline.json`` holds the results for the default sizes.
+
+``--startup`` instead times complete ``oomax -h`` and ``oomax pull`` runs
+in fresh interpreters, failing if either is slower than its target.
+
+``--transport SPEC`` instead measures the latency of a single round trip
+over each given connection to a real office,
+or to a fake one with ``--fake``::
+
+    $ python -m oomax.benchmark --transport socket:localhost:2002 \
+          --transport pipe:oomax
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from cStringIO import StringIO
+
+from exchange import Exchange
+from fake_uno import FakeOffice
+from sources import write_source
+
+doc_name = 'Benchmark'
+
+def module_names(n):
+    return ['Module{0}'.format(i) for i in range(n)]
+
+def module_text(name, lines=20):
+    body = ''.join('    x = x + {0}\n'.format(i) for i in range(lines))
+    return 'sub {0}Main\n{1}end sub\n'.format(name, body)
+
+def make_office(n, latency=0, documents=10):
+    """Returns an office with the benchmark document and some others."""
+    office = FakeOffice(latency=latency)
+    for i in range(documents):
+        office.add_document('Other {0}'.format(i),
+                            {'Standard': {'Module1': module_text('Module1')}})
+    office.add_document(doc_name, {'Standard': dict(
+        (name, module_text(name)) for name in module_names(n))})
+    return office
+
+
+# Workloads
+#
+# Each takes an exchange and the number of modules, and does its work.
+
+workloads = []
+
+def workload(name, prepare=None):
+    """Registers the decorated function as the workload `name`.
+
+    If `prepare` is given, it is called with the office and size
+    before timing starts,
+    and its result is passed to the workload as a third argument.
+    """
+    def register(function):
+        workloads.append((name, function, prepare))
+        return function
+    return register
+
+@workload('push')
+def push_each(exchange, n):
+    for name in module_names(n):
+        exchange.push(doc_name, 'Standard', name,
+                      module_text(name).splitlines(True))
+
+@workload('pull')
+def pull_each(exchange, n):
+    for name in module_names(n):
+        list(exchange.pull(doc_name, 'Standard', name))
+
+@workload('invoke')
+def invoke_each(exchange, n):
+    for name in module_names(n):
+        exchange.invoke(doc_name, 'Standard.{0}.{0}Main'.format(name))
+
+@workload('bulk push')
+def bulk_push(exchange, n):
+    exchange.push_modules(doc_name, [
+        ('Standard', name, module_text(name).splitlines(True))
+        for name in module_names(n)])
+
+@workload('bulk pull')
+def bulk_pull(exchange, n):
+    list(exchange.pull_modules(doc_name))
+
+
+# Large modules
+#
+# These take the size as thousands of lines in a single module,
+# about 20 KB each, and compare moving the module as one string
+# with moving it line by line.
+
+large_doc_name = 'Large'
+
+def add_large_document(office, n):
+    """Opens a document with one large module, and returns its text."""
+    text = module_text('Large', n * 1000)
+    office.add_document(large_doc_name, {'Standard': {'Large': text}})
+    return text
+
+@workload('large push', prepare=add_large_document)
+def large_push(exchange, n, text):
+    exchange.push(large_doc_name, 'Standard', 'Large', StringIO(text))
+
+@workload('large push lines', prepare=add_large_document)
+def large_push_lines(exchange, n, text):
+    exchange.push(large_doc_name, 'Standard', 'Large',
+                  StringIO(text).readlines())
+
+@workload('large pull', prepare=add_large_document)
+def large_pull(exchange, n, text):
+    with open(os.devnull, 'w') as f:
+        write_source(exchange.pull_text(large_doc_name, 'Standard', 'Large'),
+                     f)
+
+@workload('large pull lines', prepare=add_large_document)
+def large_pull_lines(exchange, n, text):
+    with open(os.devnull, 'w') as f:
+        f.writelines(line.rstrip('\n') + '\n' for line
+                     in exchange.pull(large_doc_name, 'Standard', 'Large'))
+
+
+def run(sizes=(1, 100, 1000), latency=0, documents=10, names=None):
+    """Runs the workloads at each size.
+
+    Returns a list of result dicts
+    with the workload name, size, seconds and round trips.
+    """
+    results = []
+    for name, function, prepare in workloads:
+        if names and name not in names:
+            continue
+        for n in sizes:
+            office = make_office(n, latency, documents)
+            args = (prepare(office, n),) if prepare else ()
+            exchange = Exchange(find_uno=office.find_uno)
+            office.reset_counts()
+            start = time.time()
+            function(exchange, n, *args)
+            seconds = time.time() - start
+            results.append({'workload': name, 'size': n, 'seconds': seconds,
+                            'round_trips': office.round_trips})
+    return results
+
+def format_results(results):
+    """Yields the lines of a table of `results`."""
+    row = '{0:<16} {1:>6} {2:>12} {3:>12}\n'.format
+    yield row('workload', 'size', 'seconds', 'round trips')
+    for result in results:
+        yield row(result['workload'], result['size'],
+                  '{0:.4f}'.format(result['seconds']), result['round_trips'])
+
+def regressions(results, baseline, time_tolerance=None):
+    """Yields descriptions of results which are worse than `baseline`.
+
+    Any increase in round trips is a regression.
+    If `time_tolerance` is given, so is taking longer than the baseline
+    by more than that fraction.
+    """
+    previous = dict(((r['workload'], r['size']), r) for r in baseline)
+    for result in results:
+        before = previous.get((result['workload'], result['size']))
+        if before is None:
+            continue
+        label = '{0} x{1}'.format(result['workload'], result['size'])
+        if result['round_trips'] > before['round_trips']:
+            yield '{0}: {1} round trips, was {2}'.format(
+                label, result['round_trips'], before['round_trips'])
+        if (time_tolerance is not None
+            and result['seconds'] > before['seconds'] * (1 + time_tolerance)):
+            yield '{0}: {1:.4f}s, was {2:.4f}s'.format(
+                label, result['seconds'], before['seconds'])
+
+
+# Transports
+
+def parse_transport(spec):
+    """Returns `Exchange` arguments for a transport `spec`.
+
+    `spec` is ``socket:HOST:PORT``, ``pipe:NAME``, or a full ``uno:`` URL.
+    """
+    kind, sep, rest = spec.partition(':')
+    if kind == 'uno':
+        return {'url': spec}
+    if kind == 'pipe':
+        return {'pipe': rest}
+    if kind == 'socket':
+        host, sep, port = rest.partition(':')
+        return {'host': host or 'localhost', 'port': port or '2002'}
+    raise ValueError("Unknown transport '{0}'.".format(spec))
+
+def time_round_trips(exchange, calls=1000):
+    """Returns the durations of `calls` minimal round trips."""
+    get_service_manager = exchange.context.getServiceManager
+    timings = []
+    for i in range(calls):
+        start = time.time()
+        get_service_manager()
+        timings.append(time.time() - start)
+    return timings
+
+def run_transports(specs, calls=1000, fake=False, latency=0):
+    """Measures round trip latency over each transport in `specs`.
+
+    If `fake` is truthy, each transport connects to its own `FakeOffice`
+    with the given `latency`, rather than to a real office.
+
+    Returns a list of ``(spec, summary)`` pairs
+    as for `macrobench.format_results`.
+    """
+    from macrobench import summarize
+    results = []
+    for spec in specs:
+        kwargs = parse_transport(spec)
+        if fake:
+            kwargs['find_uno'] = FakeOffice(latency=latency).find_uno
+        exchange = Exchange(**kwargs)
+        results.append((spec, summarize(time_round_trips(exchange, calls))))
+    return results
+
+
+# Startup
+
+startup_pull_script = """
+import sys
+from oomax import find_ooo
+from oomax.fake_uno import FakeOffice
+office = FakeOffice()
+office.add_document('Startup', {'Standard': {'Module1': 'sub main\\nend sub'}})
+find_ooo.find_uno = office.find_uno
+from oomax.__main__ import main
+sys.exit(main(['--no-daemon', 'pull', 'Startup', 'Standard.Module1']))
+"""
+
+startup_commands = [
+    ('oomax -h', [sys.executable, '-m', 'oomax', '-h']),
+    ('oomax pull', [sys.executable, '-c', startup_pull_script]),
+]
+
+def time_startup(command, runs=10):
+    """Returns the median wall time of running `command` `runs` times."""
+    timings = []
+    with open(os.devnull, 'w') as devnull:
+        for i in range(runs):
+            start = time.time()
+            subprocess.check_call(command, stdout=devnull)
+            timings.append(time.time() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def check_startup(targets, runs=10):
+    """Times each startup command against its target in seconds.
+
+    Yields ``(name, seconds, target)``.
+    """
+    for name, command in startup_commands:
+        yield name, time_startup(command, runs), targets[name]
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1,100,1000',
+        help="Comma-separated module counts.  Defaults to %(default)s.")
+    parser.add_argument('--latency', type=float, default=0,
+        help="Milliseconds added to each round trip.")
+    parser.add_argument('--documents', type=int, default=10,
+        help="Other documents open in the office.  "
+             "Defaults to %(default)s.")
+    parser.add_argument('-w', '--workload', action='append',
+        help="Run only this workload.  May be repeated.")
+    parser.add_argument('--json', metavar='FILE',
+        help="Save the results to FILE.")
+    parser.add_argument('--baseline', metavar='FILE',
+        help="Fail if results are worse than those saved in FILE.")
+    parser.add_argument('--time-tolerance', type=float,
+        help="With --baseline, also fail if a workload is slower "
+             "by more than this fraction, e.g. 0.2.")
+    parser.add_argument('--transport', metavar='SPEC', action='append',
+        help="Measure round trip latency over this connection: "
+             "socket:HOST:PORT, pipe:NAME or a uno: URL.  May be repeated.")
+    parser.add_argument('--calls', type=int, default=1000,
+        help="With --transport, the round trips to time.  "
+             "Defaults to %(default)s.")
+    parser.add_argument('--fake', action='store_true',
+        help="With --transport, connect to fake offices.")
+    parser.add_argument('--startup', action='store_true',
+        help="Time command line startup instead of the workloads.")
+    parser.add_argument('--help-target', type=float, default=0.15,
+        help="With --startup, the most seconds `oomax -h` may take.  "
+             "Defaults to %(default)s.")
+    parser.add_argument('--pull-target', type=float, default=0.25,
+        help="With --startup, the most seconds `oomax pull` may take.  "
+             "Defaults to %(default)s.")
+    options = parser.parse_args(argv)
+
+    if options.transport:
+        from macrobench import format_results as format_latencies
+        sys.stdout.writelines(format_latencies(run_transports(
+            options.transport, options.calls, options.fake,
+            options.latency / 1000.0), heading='transport'))
+        return 0
+
+    if options.startup:
+        targets = {'oomax -h': options.help_target,
+                   'oomax pull': options.pull_target}
+        slow = False
+        for name, seconds, target in check_startup(targets):
+            sys.stdout.write('{0:<16} {1:>8.4f}  target {2:.4f}\n'.format(
+                name, seconds, target))
+            slow = slow or seconds > target
+        return 1 if slow else 0
+
+    sizes = [int(size) for size in options.sizes.split(',')]
+    results = run(sizes, options.latency / 1000.0, options.documents,
+                  options.workload)
+    sys.stdout.writelines(format_results(results))
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        failures = list(regressions(results, baseline,
+                                    options.time_tolerance))
+        for failure in failures:
+            sys.stderr.write('regression: {0}\n'.format(failure))
+        if failures:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    exit(main())
@@ -1,14 +1,34 @@
 """Code to establish connection to an OOo instance."""
 import find_ooo
 
+def context_url(host='localhost', port=2002, pipe=None, url=None):
+    """Returns the UNO URL of the office's component context.
+
+    If `url` is given, it is returned as is.
+    Otherwise, if `pipe` is given, the URL connects to the named pipe;
+    this avoids TCP overhead on every call to a local office.
+    Failing both, the URL connects to the socket at `host`:`port`.
+    """
+    if url:
+        return url
+    # http://udk.openoffice.org/common/man/spec/uno-url.html
+    if pipe:
+        connection = 'pipe,name={0}'.format(pipe)
+    else:
+        connection = 'socket,host={0},port={1}'.format(host, port)
+    return 'uno:{0};urp;StarOffice.ComponentContext'.format(connection)
+
 # Equivalent to compose(openoffice.connect, openoffice._build_connect_string)
 # when using the python-openoffice module.. except for `find_uno`.
-def get_context(host='localhost', port=2002, find_uno=find_ooo.find_uno):
+def get_context(host='localhost', port=2002, find_uno=find_ooo.find_uno,
+                pipe=None, url=None):
     """Returns a resolved connection context.
 
     `find_uno` is called to acquire an `uno`:module: object.
     All subsequent calls to the UNO API will go through this object.
 
+    The connection is described as for `context_url`.
+
     Returns a `component context`, accessed via the `current context`_.
 
     .. _component context:
@@ -26,8 +46,17 @@ def get_context(host='localhost', port=2002, find_uno=find_ooo.find_uno):
     resolver_class = "com.sun.star.bridge.UnoUrlResolver"
     resolver = create_instance(resolver_class, localctx)
 
-    # http://udk.openoffice.org/common/man/spec/uno-url.html
-    context_url = ("uno:socket,host={host},port={port};"
-                   "urp;StarOffice.ComponentContext".format)
+    return resolver.resolve(context_url(host=host, port=port,
+                                        pipe=pipe, url=url))
 
-    return resolver.resolve(context_url(host=host, port=port))
+def is_alive(context):
+    """Returns True if the bridge behind `context` still answers calls.
+
+    Makes a single cheap remote call;
+    any exception is taken to mean that the office has gone away.
+    """
+    try:
+        context.getServiceManager()
+    except Exception:
+        return False
+    return True
@@ -15,12 +15,12 @@ class index_access(Sequence):
         return self._proxied.getCount()
     def __iter__(self):
         for i in range(len(self)):
-            yield self[i]
+            yield self._proxied.getByIndex(i)
     def __contains__(self, value):
         return value in iter(self)
     def __getitem__(self, item):
         if item >= len(self):
-            raise IndexError("{0} outside of index range.".format(name))
+            raise IndexError("{0} outside of index range.".format(item))
         return self._proxied.getByIndex(item)
     def __getattr__(self, name):
         return getattr(self._proxied, name)
@@ -69,3 +69,89 @@ class name_container(name_access, MutableMapping):
         if not isinstance(name, basestring):
             raise TypeError("Key '{0}' not a string.".format(name))
         self._proxied.removeByName(name)
+
+
+# Snapshots
+#
+# Each call on a proxied object is a round trip over the bridge.
+# These variants read the element names or elements once,
+# answer subsequent queries locally,
+# and only go back to the remote object when `refresh` is called.
+# They are only appropriate while nothing else is changing the container.
+
+class index_snapshot(index_access):
+    """An `index_access` which fetches every element up front."""
+    def __init__(self, proxied):
+        self._proxied = proxied
+        self.refresh()
+    def refresh(self):
+        """Re-reads the elements from the proxied object."""
+        proxied = self._proxied
+        self._items = [proxied.getByIndex(i)
+                       for i in range(proxied.getCount())]
+    def __len__(self):
+        return len(self._items)
+    def __iter__(self):
+        return iter(self._items)
+    def __contains__(self, value):
+        return value in self._items
+    def __getitem__(self, item):
+        try:
+            return self._items[item]
+        except IndexError:
+            raise IndexError("{0} outside of index range.".format(item))
+
+class name_snapshot(name_access):
+    """A `name_access` which fetches the element names up front.
+
+    Elements are fetched when first accessed and then kept.
+    If `prefetch` is truthy, all elements are fetched immediately.
+    """
+    def __init__(self, proxied, prefetch=False):
+        self._proxied = proxied
+        self.refresh(prefetch)
+    def refresh(self, prefetch=False):
+        """Re-reads the names, and discards any fetched elements."""
+        self._names = list(self._proxied.getElementNames())
+        self._values = {}
+        if prefetch:
+            for name in self._names:
+                self._values[name] = self._proxied.getByName(name)
+    def __len__(self):
+        return len(self._names)
+    def __iter__(self):
+        return iter(self._names)
+    def __contains__(self, name):
+        return name in self._names
+    def __getitem__(self, name):
+        if not isinstance(name, basestring):
+            raise TypeError("Key '{0}' not a string.".format(name))
+        try:
+            return self._values[name]
+        except KeyError:
+            if name not in self._names:
+                raise KeyError("'{0}' not in XNameAccess object.".format(name))
+        value = self._values[name] = self._proxied.getByName(name)
+        return value
+
+class name_container_snapshot(name_snapshot, name_container):
+    """A `name_snapshot` whose updates are passed on to the proxied object.
+
+    The snapshot is kept in step with the updates,
+    so that setting an element takes a single remote call.
+    """
+    def __setitem__(self, name, value):
+        if not isinstance(name, basestring):
+            raise TypeError("Key '{0}' not a string.".format(name))
+        if name in self._names:
+            self._proxied.replaceByName(name, value)
+        else:
+            self._proxied.insertByName(name, value)
+            self._names.append(name)
+        self._values[name] = value
+    def __delitem__(self, name):
+        if not isinstance(name, basestring):
+            raise TypeError("Key '{0}' not a string.".format(name))
+        self._proxied.removeByName(name)
+        self._names.remove(name)
+        self._values.pop(name, None)
@@ -14,7 +14,7 @@ def get_application_libraries(context, service_manager):
     #       there is legitimately no library for the application.
     create_instance = service_manager.createInstanceWithContext
     libraries_class = "com.sun.star.script.ApplicationScriptLibraryContainer"
-    return create_instance(library_class, context)
+    return create_instance(libraries_class, context)
 
 
 # Not sure if there's any point in parametrizing these functions.
@@ -23,7 +23,7 @@ def get_application_libraries(context, service_manager):
 # I'm mildly concerned that they could return inconsistent results
 # if the OOo app changes document while this macro is running.
 # Memoizing would allow consistent results to be returned
-# over the scope of a "transaction".
+# over the scope of a "transaction"; see `Session`.
 def resolve_doc_name(context, service_manager, desktop, doc_name,
                      get_current_doc=desktop.get_current_doc,
                      get_application_libraries=get_application_libraries,
@@ -41,7 +41,29 @@ def resolve_doc_name(context, service_manager, desktop, doc_name,
     """
     if doc_name == 'application':
         return (get_current_doc(desktop),
-                get_application_libraries(context, service_manager))
+                libraries.Libraries(
+                    get_application_libraries(context, service_manager)))
     doc = get_document(desktop, doc_name)
     libs = libraries.Libraries(get_libraries(doc))
     return doc, libs
+
+
+class Session(object):
+    """Memoizes document resolution over the scope of a "transaction".
+
+    `resolve` is called with a document name
+    and returns (doc, libraries), as `resolve_doc_name` does.
+    Each document is only resolved once per session,
+    and the same `libraries.Libraries` object,
+    with its cache of library state, is handed out each time.
+    """
+    def __init__(self, resolve):
+        self._resolve = resolve
+        self._docs = {}
+
+    def resolve(self, doc_name):
+        try:
+            return self._docs[doc_name]
+        except KeyError:
+            resolved = self._docs[doc_name] = self._resolve(doc_name)
+            return resolved
@@ -0,0 +1,258 @@
+"""Keep one `exchange.Exchange` open and serve CLI requests over a socket.
+
+Setting up an `Exchange` means finding the uno module,
+resolving a bridge to the office, and creating a desktop.
+A daemon does that once and then answers requests from thin clients
+over a local Unix socket, one JSON object per line in each direction.
+
+A request looks like ::
+
+    {"command": "push", "args": [...], "kwargs": {...}}
+
+and is answered with either ``{"result": ...}``
+or ``{"error": "...", "type": "..."}``.
+
+Anyone who can connect to the socket can run macros as its owner,
+so it lives in a directory only its owner can enter,
+is itself only accessible to its owner,
+and clients refuse a socket which belongs to anyone else.
+"""
+import json
+import os
+import socket
+import SocketServer
+import stat
+import tempfile
+
+import find_ooo
+import connect, document
+from sources import read_source, source_lines
+
+class DaemonError(Exception):
+    """Raised on the client side if the daemon reports a failure."""
+    pass
+
+
+def socket_directory():
+    """Returns the directory holding this user's daemon sockets.
+
+    That is ``$XDG_RUNTIME_DIR/oomax`` if the variable is set,
+    and otherwise a directory named after the user id
+    in the temporary directory.
+    """
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'oomax')
+    return os.path.join(tempfile.gettempdir(),
+                        'oomax-{0}'.format(os.getuid()))
+
+def default_socket_path(host='localhost', port='2002', pipe=None, url=None):
+    """Returns the socket path used for the office at `host`:`port`.
+
+    If a `pipe` or `url` is given, the path is derived from that instead.
+    The path is within `socket_directory`, so users don't share daemons.
+    """
+    if url:
+        import hashlib
+        office = 'url-' + hashlib.sha1(url).hexdigest()[:12]
+    elif pipe:
+        office = 'pipe-' + pipe
+    else:
+        office = '{0}-{1}'.format(host, port)
+    return os.path.join(socket_directory(), office + '.sock')
+
+def make_private_directory(path):
+    """Creates the directory `path` for this user alone, if it's missing.
+
+    Raises `DaemonError` if `path` already exists
+    but isn't a directory owned by this user and closed to everyone else.
+    """
+    try:
+        os.makedirs(path, 0700)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    info = os.lstat(path)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or info.st_mode & 0077):
+        raise DaemonError("'{0}' must be a directory which only you "
+                          "can access.".format(path))
+
+def check_owner(path):
+    """Raises `DaemonError` unless `path` belongs to this user."""
+    if os.lstat(path).st_uid != os.getuid():
+        raise DaemonError("'{0}' belongs to another user.".format(path))
+
+
+# Server
+
+class ExchangeDaemon(object):
+    """Holds a single `Exchange` and dispatches requests to it.
+
+    The exchange is created on first use.
+    If a call fails and the bridge turns out to be dead,
+    which happens when the office process is restarted,
+    a fresh exchange is connected and the call is retried once.
+    """
+    commands = ('push', 'pull', 'invoke')
+
+    def __init__(self, host='localhost', port='2002',
+                       find_uno=find_ooo.find_uno, pipe=None, url=None):
+        self._connect_args = dict(host=host, port=port, find_uno=find_uno,
+                                  pipe=pipe, url=url)
+        self._exchange = None
+
+    @property
+    def exchange(self):
+        if self._exchange is None:
+            from exchange import Exchange
+            self._exchange = Exchange(**self._connect_args)
+        return self._exchange
+
+    def call(self, command, args=(), kwargs={}):
+        """Runs `command` on the exchange and returns a serializable result."""
+        if command not in self.commands:
+            raise DaemonError("Unknown command '{0}'.".format(command))
+        try:
+            return self._call(command, args, kwargs)
+        except Exception:
+            if self._exchange is None or connect.is_alive(self._exchange.context):
+                raise
+            self._exchange = None
+            return self._call(command, args, kwargs)
+
+    def _call(self, command, args, kwargs):
+        if command == 'pull':
+            # The text is sent back as the single string the office holds.
+            return self.exchange.pull_text(*args, **kwargs)
+        result = getattr(self.exchange, command)(*args, **kwargs)
+        if command == 'invoke':
+            return document.plain_value(result)
+        # Documents and other UNO objects can't be sent back.
+        return None
+
+
+class RequestHandler(SocketServer.StreamRequestHandler):
+    """Answers each request line on a connection in turn."""
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                result = self.server.daemon.call(request['command'],
+                                                 request.get('args', ()),
+                                                 request.get('kwargs', {}))
+                response = {'result': result}
+            except Exception as e:
+                response = {'error': str(e), 'type': type(e).__name__}
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class DaemonServer(SocketServer.UnixStreamServer):
+    """Serves requests one at a time; the UNO bridge isn't free-threaded.
+
+    The socket at `path` is only accessible to its owner.
+    """
+    def __init__(self, path, daemon):
+        self.daemon = daemon
+        SocketServer.UnixStreamServer.__init__(self, path, RequestHandler)
+
+    def server_bind(self):
+        # Nobody else gets a chance to connect between binding and chmod.
+        umask = os.umask(0177)
+        try:
+            SocketServer.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0600)
+
+
+def serve(path, host='localhost', port='2002', find_uno=find_ooo.find_uno,
+          pipe=None, url=None):
+    """Runs a daemon on the Unix socket at `path` until interrupted.
+
+    The socket is only accessible to its owner.
+    If `path` is the default, its directory is created if necessary.
+    The other arguments are those of `Exchange`.
+    """
+    directory = os.path.dirname(path)
+    if directory == socket_directory():
+        make_private_directory(directory)
+    if os.path.lexists(path):
+        client = connect_client(path)
+        if client is not None:
+            client.close()
+            raise DaemonError("A daemon is already listening on "
+                              "'{0}'.".format(path))
+        # Left over from a daemon that didn't shut down cleanly.
+        os.unlink(path)
+    server = DaemonServer(path, ExchangeDaemon(host, port, find_uno,
+                                               pipe=pipe, url=url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+# Client
+
+class DaemonClient(object):
+    """Stands in for an `Exchange` by forwarding calls to a daemon.
+
+    Provides `push`, `pull`, `pull_text` and `invoke` with the same signatures
+    as the corresponding `Exchange` methods.
+    """
+    def __init__(self, sock):
+        self._sock = sock
+        self._rfile = sock.makefile('rb')
+
+    def call(self, command, *args, **kwargs):
+        request = {'command': command, 'args': args, 'kwargs': kwargs}
+        self._sock.sendall(json.dumps(request) + '\n')
+        response = json.loads(self._rfile.readline())
+        if 'error' in response:
+            raise DaemonError("{type}: {error}".format(**response))
+        return response['result']
+
+    def push(self, doc_name, library_name, module_name, source, save=False):
+        return self.call('push', doc_name, library_name, module_name,
+                         read_source(source), save=save)
+
+    def pull(self, doc_name, library_name, module_name):
+        return source_lines(self.pull_text(doc_name, library_name,
+                                           module_name))
+
+    def pull_text(self, doc_name, library_name, module_name):
+        return self.call('pull', doc_name, library_name, module_name)
+
+    def invoke(self, doc_name, macro_name, args=()):
+        return self.call('invoke', doc_name, macro_name, list(args))
+
+    def close(self):
+        self._rfile.close()
+        self._sock.close()
+
+
+def connect_client(path):
+    """Returns a `DaemonClient` for the daemon at `path`, or None.
+
+    None is returned if no daemon is listening there.
+    Raises `DaemonError` if the socket belongs to another user,
+    who could otherwise see everything sent to it.
+    """
+    try:
+        check_owner(path)
+    except OSError:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        sock.close()
+        return None
+    return DaemonClient(sock)
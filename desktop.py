@@ -5,14 +5,21 @@ class DocLibLookupError(Exception):
     """Raised if document name lookup fails."""
     pass
 
+class DuplicateDocumentError(DocLibLookupError):
+    """Raised if more than one open document has the looked-up name."""
+    pass
+
 
 def get_current_doc(desktop):
     """Returns the currently open document."""
     return desktop.getCurrentComponent()
 
 def get_document(desktop, doc_name):
-    """Returns the first document corresponding to `doc_name`."""
-    # TODO: Consider implementing a check for duplicate document names.
+    """Returns the first document corresponding to `doc_name`.
+
+    `DocumentIndex` avoids rescanning the frames on every lookup
+    and checks for duplicate document names.
+    """
     frames = index_access(desktop.getFrames())
     controllers = (frame.getController() for frame in frames)
     for controller in controllers:
@@ -20,3 +27,75 @@ def get_document(desktop, doc_name):
             return controller.getModel()
 
     raise DocLibLookupError(doc_name)
+
+
+class DocumentIndex(object):
+    """Maps document titles to models without scanning frames every time.
+
+    The frames are scanned on the first lookup.
+    Later lookups check the indexed models' titles,
+    which takes a couple of remote calls per model,
+    and only rescan if that check fails or the title isn't indexed.
+
+    A document opened with the same title as an indexed one
+    won't be noticed as a duplicate until the next rescan.
+    """
+    def __init__(self, desktop):
+        self.desktop = desktop
+        self._models = None
+
+    def refresh(self):
+        """Rebuilds the index from the desktop's frames."""
+        models = {}
+        for frame in index_access(self.desktop.getFrames()):
+            controller = frame.getController()
+            if controller:
+                models.setdefault(controller.getTitle(), []).append(
+                    controller.getModel())
+        self._models = models
+
+    def names(self):
+        """Returns the titles of the open documents, rescanning the frames.
+
+        A title is listed once even if several documents have it.
+        """
+        self.refresh()
+        return sorted(self._models)
+
+    def documents(self):
+        """Returns ``(title, model)`` for each open document, by title.
+
+        The frames are rescanned once.
+        Every model is listed, including any which share a title.
+        """
+        self.refresh()
+        return [(title, model)
+                for title, models in sorted(self._models.iteritems())
+                for model in models if model is not None]
+
+    def _is_current(self, doc_name):
+        models = self._models.get(doc_name)
+        if not models:
+            return False
+        try:
+            return all(model.getCurrentController().getTitle() == doc_name
+                       for model in models)
+        except Exception:
+            # Closed documents raise DisposedException,
+            # and models without a controller give None.
+            return False
+
+    def get_document(self, doc_name):
+        """Returns the document corresponding to `doc_name`.
+
+        Raises DuplicateDocumentError
+        if several open documents have that name.
+        """
+        if self._models is None or not self._is_current(doc_name):
+            self.refresh()
+        models = self._models.get(doc_name)
+        if not models:
+            raise DocLibLookupError(doc_name)
+        if len(models) > 1:
+            raise DuplicateDocumentError(doc_name)
+        return models[0]
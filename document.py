@@ -16,7 +16,48 @@ def get_libraries(document):
     """Returns the libraries for the `document`."""
     return document.BasicLibraries
 
-def invoke_macro(doc, script_name):
+def invoke_macro(doc, script_name, args=()):
+    """Runs the macro `script_name` in `doc` and returns its result."""
     provider = doc.getScriptProvider()
     script = provider.getScript(script_name_url(script_name))
-    return script.invoke((), (), ())
+    return script.invoke(tuple(args), (), ())[0]
+
+def plain_value(value):
+    """Converts a macro result into plain data, e.g. for JSON.
+
+    Basic arrays come back as tuples and are turned into lists.
+    Other UNO values, such as structs, are represented by their `repr`.
+    """
+    if value is None or isinstance(value, (basestring, bool, int, long,
+                                           float)):
+        return value
+    if isinstance(value, (tuple, list)):
+        return [plain_value(item) for item in value]
+    return repr(value)
+
+
+class ScriptCache(object):
+    """Invokes macros in `document`, keeping the script objects.
+
+    Getting the script provider and a script are a round trip each,
+    so after the first call to a macro
+    invoking it again only takes the one call.
+    """
+    def __init__(self, document):
+        self.document = document
+        self._provider = None
+        self._scripts = {}
+
+    def get_script(self, script_name):
+        try:
+            return self._scripts[script_name]
+        except KeyError:
+            if self._provider is None:
+                self._provider = self.document.getScriptProvider()
+            script = self._scripts[script_name] = self._provider.getScript(
+                script_name_url(script_name))
+            return script
+
+    def invoke(self, script_name, args=()):
+        """Runs the macro `script_name` and returns its result."""
+        return self.get_script(script_name).invoke(tuple(args), (), ())[0]
@@ -4,40 +4,164 @@ The main functions -- `push`, `pull`, `run` --
 can be invoked from the CLI.
 """
 import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
 
 import find_ooo
-import connect, context, document, libraries, library
+import connect, container, context, desktop, document, instrument
+import libraries, library
+from sources import source_text, source_lines
+
+
+class DocumentResult(namedtuple('DocumentResult',
+                                'document status error seconds')):
+    """The outcome of `Exchange.push_all` for one document.
+
+    `status` is 'ok', 'skipped' if the library is read-only
+    or password-protected or the document has no Basic libraries,
+    or 'failed'.
+    `error` is the exception raised, if any.
+    """
+    __slots__ = ()
+
 
 class Exchange:
     """Class of the main exchange object.
 
     Its initialization finds a local OpenOffice installation
-    and attempts to connect to an instance of OOo on the given host/port.
+    and attempts to connect to an instance of OOo on the given host/port,
+    or on the named `pipe`, or at the UNO `url` (see `connect.context_url`).
 
     It retains the context, service manager, and desktop acquired
-    from this connection for use by one or more of the exchange methods.
+    from this connection for use by one or more of the exchange methods,
+    along with an index of the desktop's documents by name.
+
+    If an `instrument.Recorder` is given as `recorder`,
+    every remote call and the phases of each operation are timed.
     """
     def __init__(self, host='localhost', port='2002',
-                       find_uno=find_ooo.find_uno):
-        self.context = connect.get_context(host=host, port=port,
-                                           find_uno=find_uno)
+                       find_uno=find_ooo.find_uno,
+                       recorder=instrument.null_recorder,
+                       pipe=None, url=None):
+        self.recorder = recorder
+        with recorder.phase('connect'):
+            self.context = recorder.wrap(
+                connect.get_context(host=host, port=port, find_uno=find_uno,
+                                    pipe=pipe, url=url),
+                'ComponentContext')
         self.smgr = self.context.getServiceManager()
         self.desktop = context.get_desktop(self.context, self.smgr)
+        self.documents = desktop.DocumentIndex(self.desktop)
+        self._session = None
+        self._scripts = {}
+
+    @contextmanager
+    def transaction(self):
+        """Shares document lookups and library state within a `with` block.
+
+        Within the block, each document is resolved only once,
+        and a library's flags are only checked the first time it is used,
+        however many exchange methods are called.
+        Nested transactions share the outermost one's state.
+
+        >>> with exchange.transaction():
+        ...     exchange.push('Untitled 1', 'Standard', 'A', source_a)
+        ...     exchange.push('Untitled 1', 'Standard', 'B', source_b)
+        ... # doctest: +SKIP
+        """
+        outer = self._session
+        if outer is None:
+            self._session = context.Session(self._resolve)
+        try:
+            yield self
+        finally:
+            self._session = outer
+
+    def resolve(self, doc_name):
+        """Returns (doc, libraries) for `doc_name`.
+
+        See `context.resolve_doc_name`.
+        Results are reused within a `transaction`.
+        """
+        with self.recorder.phase('resolve'):
+            if self._session is not None:
+                return self._session.resolve(doc_name)
+            return self._resolve(doc_name)
+
+    def _resolve(self, doc_name):
+        return context.resolve_doc_name(
+            self.context, self.smgr, self.desktop, doc_name,
+            get_document=lambda _, name: self.documents.get_document(name))
 
-    def invoke(self, doc_name, macro_name):
+    def invoke(self, doc_name, macro_name, args=()):
         """Invoke the macro in the running OOo instance.
 
         `macro_name` should be a fully-qualified macro name,
         for example 'Standard.Module1.main'.
+        `args` are passed to the macro, and its result is returned.
+
+        The script objects are kept for later invocations
+        until the document is closed or code is pushed to it.
+        """
+        scripts = self._script_cache(doc_name)
+        with self.recorder.phase('invoke'):
+            return scripts.invoke(macro_name, args)
+
+    def _script_cache(self, doc_name):
+        doc, libs = self.resolve(doc_name)
+        scripts = self._scripts.get(doc_name)
+        if scripts is None or scripts.document is not doc:
+            scripts = self._scripts[doc_name] = document.ScriptCache(doc)
+        return scripts
+
+    def time_macro(self, doc_name, macro_name, iterations=100, warmup=5,
+                   args=()):
+        """Times repeated invocations of a macro.
+
+        The document and script are looked up before timing starts,
+        and `warmup` untimed invocations are made first,
+        so only the invocations themselves are measured.
+
+        Returns a list of the `iterations` durations in seconds.
+        """
+        script = self._script_cache(doc_name).get_script(macro_name)
+        args = tuple(args)
+        for i in range(warmup):
+            script.invoke(args, (), ())
+        timings = []
+        for i in range(iterations):
+            start = time.time()
+            script.invoke(args, (), ())
+            timings.append(time.time() - start)
+        return timings
+
+    def invoke_many(self, calls):
+        """Invokes a series of macros, carrying on past failures.
+
+        `calls` is an iterable of ``(doc_name, macro_name, args)``.
+        Each document is resolved only once.
+
+        Yields a ``(result, error, seconds)`` tuple for each call, in order,
+        where `error` is the exception raised, or None.
         """
-        doc, libs = context.resolve_doc_name(self.context, self.smgr,
-                                             self.desktop, doc_name)
-        document.invoke_macro(doc, macro_name)
+        with self.transaction():
+            for doc_name, macro_name, args in calls:
+                start = time.time()
+                try:
+                    result = self.invoke(doc_name, macro_name, args)
+                except Exception as e:
+                    yield None, e, time.time() - start
+                else:
+                    yield result, None, time.time() - start
 
     def push(self, doc_name, library_name, module_name, source, save=False):
         """Pushes the module code for `macro_name` from `source`.
 
         If the library does not exist, it is created.
+        `source` may be a file, which is read in one go,
+        a string, or an iterable of lines.
 
         If `save` is truthy, the updated document will be saved to disk.
 
@@ -49,17 +173,141 @@ class Exchange:
         ... # doctest: +SKIP
         """
         # TODO: There should probably be some exception-handling in here.
-        doc, libs = context.resolve_doc_name(self.context, self.smgr,
-                                             self.desktop, doc_name)
-        joined_source = '\n'.join(line.rstrip('\n') for line in source)
-        try:
-            libs[library_name][module_name] = joined_source
-        except KeyError:
-            libs.createLibrary(library_name)
-            libs[library_name][module_name] = joined_source
+        doc, libs = self.resolve(doc_name)
+        joined_source = source_text(source)
+        with self.recorder.phase('library'):
+            try:
+                lib = libs[library_name]
+            except KeyError:
+                libs.createLibrary(library_name)
+                lib = libs[library_name]
+        with self.recorder.phase('set module'):
+            lib[module_name] = joined_source
+
+        self._scripts.pop(doc_name, None)
+        self._commit(doc, libs, save)
+        return doc
+
+    def push_modules(self, doc_name, modules, save=False):
+        """Pushes several modules to `doc_name` in one go.
+
+        `modules` is an iterable of
+        ``(library_name, module_name, source)`` tuples,
+        where each `source` is as for `push`.
+
+        The document is looked up once,
+        all missing libraries are created before any module is set,
+        and the document is saved or marked modified once at the end.
 
+        Returns a list of ``(library_name, module_name, seconds)``
+        giving the time taken to set each module.
+        """
+        doc, libs = self.resolve(doc_name)
+        modules = list(modules)
+        with self.recorder.phase('library'):
+            existing = set(libs)
+            for library_name in sorted(set(m[0] for m in modules) - existing):
+                libs.createLibrary(library_name)
+
+        timings = []
+        for library_name, module_name, source in modules:
+            start = time.time()
+            with self.recorder.phase('library'):
+                lib = libs[library_name]
+            with self.recorder.phase('set module'):
+                lib[module_name] = source_text(source)
+            timings.append((library_name, module_name, time.time() - start))
+
+        self._scripts.pop(doc_name, None)
+        self._commit(doc, libs, save)
+        return timings
+
+    def push_all(self, library_name, module_name, source, match='*',
+                 save=False):
+        """Pushes one module to every open document whose title matches.
+
+        `match` is a glob pattern for the document titles.
+        The frames are scanned once, whatever the number of documents.
+        Documents where the module can't be written are skipped,
+        and failures don't stop the others from being pushed to.
+
+        Returns a list of `DocumentResult`, ordered by title.
+        """
+        joined_source = source_text(source)
+        with self.recorder.phase('resolve'):
+            documents = [(title, doc)
+                         for title, doc in self.documents.documents()
+                         if fnmatchcase(title, match)]
+        results = []
+        for title, doc in documents:
+            start = time.time()
+            try:
+                try:
+                    libs = libraries.Libraries(document.get_libraries(doc))
+                except AttributeError:
+                    # Windows such as the Basic IDE have no libraries.
+                    raise library.ReadonlyLibraryError(
+                        "'{0}' has no Basic libraries.".format(title))
+                with self.recorder.phase('library'):
+                    try:
+                        lib = libs[library_name]
+                    except KeyError:
+                        libs.createLibrary(library_name)
+                        lib = libs[library_name]
+                with self.recorder.phase('set module'):
+                    lib[module_name] = joined_source
+                self._scripts.pop(title, None)
+                self._commit(doc, libs, save)
+            except (libraries.PasswordProtectionError,
+                    library.ReadonlyLibraryError) as e:
+                results.append(DocumentResult(title, 'skipped', e,
+                                              time.time() - start))
+            except Exception as e:
+                results.append(DocumentResult(title, 'failed', e,
+                                              time.time() - start))
+            else:
+                results.append(DocumentResult(title, 'ok', None,
+                                              time.time() - start))
+        return results
+
+    @contextmanager
+    def batch(self, doc_name, save=False):
+        """Queues changes to `doc_name` and applies them together.
+
+        The document is resolved once.
+        Module writes, module deletions and library creations
+        queued on the `Batch` are applied when the block exits,
+        followed by a single save or `setModified`.
+        Nothing is applied if the block raises.
+        If applying or saving fails, the touched modules are put back
+        as they were and any libraries created are removed.
+
+        >>> with exchange.batch('Untitled 1', save=True) as batch:
+        ...     batch.push('Standard', 'A', source_a)
+        ...     batch.delete('Standard', 'Obsolete')
+        ... # doctest: +SKIP
+        """
+        with self.transaction():
+            doc, libs = self.resolve(doc_name)
+            queued = Batch(doc, libs)
+            yield queued
+            if not queued.operations:
+                return
+            self._scripts.pop(doc_name, None)
+            with self.recorder.phase('batch'):
+                queued.apply()
+            try:
+                self._commit(doc, libs, save)
+            except Exception:
+                exc_info = sys.exc_info()
+                queued.roll_back()
+                raise exc_info[0], exc_info[1], exc_info[2]
+
+    def _commit(self, doc, libs, save):
+        """Saves `doc`, or marks it and its `libs` as modified."""
         if save:
-            doc.store()
+            with self.recorder.phase('store'):
+                doc.store()
         else:
             # There doesn't appear to be any way to cause an open Basic editor
             # to change its save icon to active.
@@ -68,7 +316,6 @@ class Exchange:
             # in order to be sure.
             libs.setModified(True)
             doc.setModified(True)
-        return doc
 
     def pull(self, doc_name, library_name, module_name):
         """Gets the module code for `macro_name` from `source`.
@@ -83,7 +330,126 @@ class Exchange:
          '    MsgBox("This is the main macro in Standard.Module1.")',
          'end sub']
         """
-        doc, libs = context.resolve_doc_name(self.context, self.smgr,
-                                             self.desktop, doc_name)
-        lib = libs[library_name][module_name]
-        return (line + "\n" for line in lib.rstrip('\n').split('\n'))
+        return source_lines(self.pull_text(doc_name, library_name,
+                                           module_name))
+
+    def pull_text(self, doc_name, library_name, module_name):
+        """Returns the module's code as the single string the office holds.
+
+        See `sources.write_source` for writing it to a file.
+        """
+        doc, libs = self.resolve(doc_name)
+        with self.recorder.phase('library'):
+            lib = libs[library_name]
+        with self.recorder.phase('get module'):
+            return lib[module_name]
+
+    def pull_modules(self, doc_name, library_names=None):
+        """Gets the code of every module in `doc_name`.
+
+        If `library_names` is given, only those libraries are read.
+        Password-protected libraries are skipped.
+        Each library's modules are fetched together,
+        without a separate existence check for each.
+
+        Yields ``(library_name, module_name, text)`` tuples.
+        """
+        doc, libs = self.resolve(doc_name)
+        if library_names is None:
+            library_names = list(libs)
+        for library_name in library_names:
+            try:
+                with self.recorder.phase('library'):
+                    lib = libs[library_name]
+            except libraries.PasswordProtectionError:
+                continue
+            with self.recorder.phase('get module'):
+                modules = container.name_snapshot(lib, prefetch=True)
+            for module_name in modules:
+                yield library_name, module_name, modules[module_name]
+
+
+class Batch(object):
+    """Changes to one document, queued by `Exchange.batch`."""
+    def __init__(self, doc, libs):
+        self.doc = doc
+        self.libs = libs
+        self.operations = []
+        # Filled in by `apply`: the text of each touched module
+        # before the batch, or None if the module didn't exist,
+        # and the libraries it created.
+        self.originals = {}
+        self.created = []
+
+    def push(self, library_name, module_name, source):
+        """Queues setting a module's code, as for `Exchange.push`.
+
+        The library is created if it doesn't exist.
+        """
+        self.set_text(library_name, module_name, source_text(source))
+
+    def set_text(self, library_name, module_name, text):
+        """Queues setting a module's text exactly as given."""
+        self.operations.append(('set', library_name, module_name, text))
+
+    def delete(self, library_name, module_name):
+        """Queues removing a module."""
+        self.operations.append(('delete', library_name, module_name, None))
+
+    def create_library(self, library_name):
+        """Queues creating an empty library, if it doesn't exist."""
+        self.operations.append(('create', library_name, None, None))
+
+    def apply(self):
+        """Applies the queued operations, undoing them if one fails."""
+        libs = self.libs
+        existing = set(libs)
+        created = self.created
+        originals = self.originals
+        try:
+            needed = set(op[1] for op in self.operations
+                         if op[0] in ('set', 'create'))
+            for library_name in sorted(needed - existing):
+                libs.createLibrary(library_name)
+                created.append(library_name)
+            for kind, library_name, module_name, text in self.operations:
+                if kind == 'create':
+                    continue
+                lib = libs[library_name]
+                key = library_name, module_name
+                if key not in originals:
+                    originals[key] = (lib[module_name]
+                                      if module_name in lib else None)
+                if kind == 'set':
+                    lib[module_name] = text
+                elif module_name in lib:
+                    del lib[module_name]
+                else:
+                    raise KeyError("No module '{0}' in library '{1}'.".format(
+                        module_name, library_name))
+        except Exception:
+            exc_info = sys.exc_info()
+            self.roll_back()
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def roll_back(self):
+        """Undoes what `apply` did, as far as possible."""
+        # Best effort: carry on restoring past any failure.
+        libs = self.libs
+        created = self.created
+        for (library_name, module_name), text in self.originals.iteritems():
+            if library_name in created:
+                continue
+            try:
+                lib = libs[library_name]
+                if text is not None:
+                    lib[module_name] = text
+                elif module_name in lib:
+                    del lib[module_name]
+            except Exception:
+                pass
+        for library_name in created:
+            try:
+                libs.removeLibrary(library_name)
+            except Exception:
+                pass
@@ -0,0 +1,418 @@
+"""An in-process stand-in for the `uno` module and a running office.
+
+A `FakeOffice` emulates just enough of the UNO API
+for everything in this package to work against it:
+the URL resolver, the desktop and its frames,
+documents with their ``BasicLibraries``, `store`,
+script providers, and the application library container.
+
+Every call that would cross the bridge to a real office
+counts as a round trip and can be delayed by `latency` seconds.
+
+`FakeOffice.find_uno` can be passed anywhere a `find_uno` is accepted::
+
+    >>> office = FakeOffice()
+    >>> doc = office.add_document('Untitled 1',
+    ...                           {'Standard': {'Module1': 'sub main\\nend sub'}})
+    >>> exchange = Exchange(find_uno=office.find_uno)
+"""
+import re
+import time
+
+class FakeUnoError(Exception):
+    """Stands in for the UNO exceptions a real office would raise."""
+    pass
+
+class FakeDisposedError(FakeUnoError):
+    """Raised by objects belonging to an office which has been restarted."""
+    pass
+
+
+def remote(method):
+    """Marks `method` as a call which crosses the bridge."""
+    def call(self, *args):
+        self._office.round_trip(self, method.__name__)
+        return method(self, *args)
+    call.__name__ = method.__name__
+    call.__doc__ = method.__doc__
+    return call
+
+
+class Remote(object):
+    """Base of the objects which live on the office side of the bridge."""
+    def __init__(self, office):
+        self._office = office
+        self._generation = office.generation
+
+
+# Containers
+
+class FakeIndexAccess(Remote):
+    def __init__(self, office, items):
+        Remote.__init__(self, office)
+        self._items = list(items)
+
+    @remote
+    def getCount(self):
+        return len(self._items)
+
+    @remote
+    def getByIndex(self, index):
+        if not 0 <= index < len(self._items):
+            raise FakeUnoError("IndexOutOfBoundsException: {0}".format(index))
+        return self._items[index]
+
+
+class FakeNameContainer(Remote):
+    def __init__(self, office, elements=()):
+        Remote.__init__(self, office)
+        self._elements = dict(elements)
+
+    @remote
+    def hasByName(self, name):
+        return name in self._elements
+
+    @remote
+    def getByName(self, name):
+        try:
+            return self._elements[name]
+        except KeyError:
+            raise FakeUnoError("NoSuchElementException: {0}".format(name))
+
+    @remote
+    def getElementNames(self):
+        return tuple(sorted(self._elements))
+
+    @remote
+    def hasElements(self):
+        return bool(self._elements)
+
+    @remote
+    def insertByName(self, name, value):
+        if name in self._elements:
+            raise FakeUnoError("ElementExistException: {0}".format(name))
+        self._elements[name] = value
+
+    @remote
+    def replaceByName(self, name, value):
+        if name not in self._elements:
+            raise FakeUnoError("NoSuchElementException: {0}".format(name))
+        self._elements[name] = value
+
+    @remote
+    def removeByName(self, name):
+        if name not in self._elements:
+            raise FakeUnoError("NoSuchElementException: {0}".format(name))
+        del self._elements[name]
+
+
+class FakeLibraryContainer(FakeNameContainer):
+    """Emulates ``BasicLibraries``; its elements are `FakeNameContainer`s."""
+    def __init__(self, office, libraries=None, read_only=(), passwords={}):
+        FakeNameContainer.__init__(self, office)
+        self.read_only = set(read_only)
+        self.passwords = dict(passwords)
+        self.verified = set()
+        self.modified = False
+        for library_name, modules in (libraries or {}).iteritems():
+            self._elements[library_name] = FakeNameContainer(office, modules)
+
+    def modules(self, library_name):
+        """Returns a library's modules as a dict, without a round trip."""
+        return self._elements[library_name]._elements
+
+    @remote
+    def createLibrary(self, name):
+        if name in self._elements:
+            raise FakeUnoError("ElementExistException: {0}".format(name))
+        library = self._elements[name] = FakeNameContainer(self._office)
+        return library
+
+    @remote
+    def removeLibrary(self, name):
+        if name not in self._elements:
+            raise FakeUnoError("NoSuchElementException: {0}".format(name))
+        del self._elements[name]
+
+    @remote
+    def isLibraryLoaded(self, name):
+        return True
+
+    @remote
+    def loadLibrary(self, name):
+        pass
+
+    @remote
+    def isLibraryReadOnly(self, name):
+        return name in self.read_only
+
+    @remote
+    def isLibraryPasswordProtected(self, name):
+        return name in self.passwords
+
+    @remote
+    def isLibraryPasswordVerified(self, name):
+        return name in self.verified
+
+    @remote
+    def verifyLibraryPassword(self, name, password):
+        if self.passwords.get(name) == password:
+            self.verified.add(name)
+            return True
+        return False
+
+    @remote
+    def setModified(self, modified):
+        self.modified = modified
+
+    @remote
+    def isModified(self):
+        return self.modified
+
+
+# Scripting
+
+script_url = re.compile(r'vnd\.sun\.star\.script:([^?]+)\?')
+
+class FakeScript(Remote):
+    def __init__(self, office, document, name):
+        Remote.__init__(self, office)
+        self._document = document
+        self.name = name
+
+    @remote
+    def invoke(self, args, out_indexes, out_args):
+        macro = self._office.macros.get(self.name, lambda *args: None)
+        self._document.invocations.append((self.name, args))
+        return macro(*args), (), ()
+
+
+class FakeScriptProvider(Remote):
+    def __init__(self, office, document):
+        Remote.__init__(self, office)
+        self._document = document
+
+    @remote
+    def getScript(self, url):
+        match = script_url.match(url)
+        if not match:
+            raise FakeUnoError("ScriptFrameworkErrorException: {0}".format(url))
+        name = match.group(1)
+        library_name, module_name = name.split('.')[:2]
+        libraries = self._document.libraries._elements
+        if (library_name not in libraries
+            or module_name not in libraries[library_name]._elements):
+            raise FakeUnoError("ScriptFrameworkErrorException: {0}".format(url))
+        return FakeScript(self._office, self._document, name)
+
+
+# Desktop
+
+class FakeDocument(Remote):
+    """A document model.
+
+    Its `libraries` are served as ``BasicLibraries``.
+    """
+    def __init__(self, office, title, libraries=None, **library_options):
+        Remote.__init__(self, office)
+        self.title = title
+        self.libraries = FakeLibraryContainer(office, libraries,
+                                              **library_options)
+        self.modified = False
+        self.store_count = 0
+        self.invocations = []
+        self.controller = FakeController(office, self)
+
+    @property
+    def BasicLibraries(self):
+        # Reading a property is a round trip too.
+        self._office.round_trip(self, 'BasicLibraries')
+        return self.libraries
+
+    @remote
+    def store(self):
+        self.store_count += 1
+        self.modified = False
+
+    @remote
+    def setModified(self, modified):
+        self.modified = modified
+
+    @remote
+    def isModified(self):
+        return self.modified
+
+    @remote
+    def getCurrentController(self):
+        return self.controller
+
+    @remote
+    def getScriptProvider(self):
+        return FakeScriptProvider(self._office, self)
+
+
+class FakeController(Remote):
+    def __init__(self, office, document):
+        Remote.__init__(self, office)
+        self._document = document
+
+    @remote
+    def getTitle(self):
+        return self._document.title
+
+    @remote
+    def getModel(self):
+        return self._document
+
+
+class FakeFrame(Remote):
+    def __init__(self, office, document):
+        Remote.__init__(self, office)
+        self._document = document
+
+    @remote
+    def getController(self):
+        return self._document.controller
+
+
+class FakeDesktop(Remote):
+    @remote
+    def getFrames(self):
+        return FakeIndexAccess(self._office,
+                               [FakeFrame(self._office, document)
+                                for document in self._office.documents])
+
+    @remote
+    def getCurrentComponent(self):
+        documents = self._office.documents
+        return documents[0] if documents else None
+
+
+class FakeServiceManager(Remote):
+    @remote
+    def createInstanceWithContext(self, service, context):
+        office = self._office
+        if service == "com.sun.star.frame.Desktop":
+            return FakeDesktop(office)
+        if service == "com.sun.star.script.ApplicationScriptLibraryContainer":
+            return office.application_libraries
+        raise FakeUnoError("Unknown service '{0}'.".format(service))
+
+
+class FakeComponentContext(Remote):
+    @remote
+    def getServiceManager(self):
+        return FakeServiceManager(self._office)
+
+
+# The local side of the bridge; none of these calls are round trips.
+
+class LocalResolver(object):
+    def __init__(self, office):
+        self._office = office
+
+    def resolve(self, url):
+        office = self._office
+        office.round_trip(self, 'resolve')
+        office.resolved_urls.append(url)
+        if not office.running:
+            raise FakeUnoError("NoConnectException: {0}".format(url))
+        return FakeComponentContext(office)
+
+class LocalServiceManager(object):
+    def __init__(self, office):
+        self._office = office
+
+    def createInstanceWithContext(self, service, context):
+        if service == "com.sun.star.bridge.UnoUrlResolver":
+            return LocalResolver(self._office)
+        raise FakeUnoError("Unknown local service '{0}'.".format(service))
+
+class LocalContext(object):
+    def __init__(self, office):
+        self._office = office
+
+    def getServiceManager(self):
+        return LocalServiceManager(self._office)
+
+
+class FakeOffice(object):
+    """A running office, reachable through `find_uno`.
+
+    `latency` is the number of seconds each round trip takes.
+    `calls` maps ``(class name, method name)`` to the number of calls made,
+    and `round_trips` is their total.
+
+    `macros` maps fully-qualified macro names to Python callables
+    which are run when the macro is invoked.
+    """
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.documents = []
+        self.macros = {}
+        self.calls = {}
+        self.round_trips = 0
+        self.resolved_urls = []
+        self.running = True
+        self.generation = 0
+        self.application_libraries = FakeLibraryContainer(self)
+
+    def round_trip(self, obj, method_name):
+        if getattr(obj, '_generation', self.generation) != self.generation:
+            raise FakeDisposedError("DisposedException: {0}.{1}".format(
+                type(obj).__name__, method_name))
+        key = (type(obj).__name__, method_name)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counts(self):
+        self.calls.clear()
+        self.round_trips = 0
+
+    def add_document(self, title, libraries=None, **library_options):
+        """Opens a document with the given `libraries`.
+
+        `libraries` maps library names to dicts of module names and text.
+        `read_only` and `passwords` are passed to `FakeLibraryContainer`.
+        """
+        document = FakeDocument(self, title, libraries, **library_options)
+        self.documents.append(document)
+        return document
+
+    def close_document(self, document):
+        self.documents.remove(document)
+
+    def restart(self):
+        """Invalidates every object handed out so far.
+
+        Documents are reopened as new objects with the same contents,
+        as though they had been recovered after a crash.
+        """
+        self.generation += 1
+        self.documents = [self._reopen(document)
+                          for document in self.documents]
+        self.application_libraries = self._reopen_libraries(
+            self.application_libraries)
+
+    def _reopen(self, document):
+        reopened = FakeDocument(self, document.title)
+        reopened.libraries = self._reopen_libraries(document.libraries)
+        return reopened
+
+    def _reopen_libraries(self, container):
+        libraries = dict((name, library._elements)
+                         for name, library in container._elements.iteritems())
+        return FakeLibraryContainer(self, libraries,
+                                    read_only=container.read_only,
+                                    passwords=container.passwords)
+
+    # The `uno` module interface
+
+    def getComponentContext(self):
+        return LocalContext(self)
+
+    def find_uno(self):
+        """Returns this office in the role of the `uno` module."""
+        return self
@@ -0,0 +1,134 @@
+"""Run the same operation against many office instances at once.
+
+Each target gets its own `Exchange`, created and used in a worker thread,
+so the total time is close to that of the slowest target
+rather than the sum of them all.
+"""
+import threading
+import time
+from collections import namedtuple
+from Queue import Queue, Empty
+
+import find_ooo
+from exchange import Exchange
+
+class TargetTimeoutError(Exception):
+    """Recorded as a target's error if it doesn't finish in time."""
+    pass
+
+
+class TargetResult(namedtuple('TargetResult', 'target result error seconds')):
+    """The outcome of an operation on one target.
+
+    `target` is a ``(host, port)`` tuple.
+    Exactly one of `result` and `error` is meaningful;
+    `error` is None if the operation succeeded.
+    """
+    __slots__ = ()
+
+def parse_target(text, default_port='2002'):
+    """Returns ``(host, port)`` for a ``host[:port]`` string."""
+    host, sep, port = text.partition(':')
+    return host or 'localhost', port or default_port
+
+def parse_targets(text, default_port='2002'):
+    """Parses a comma-separated list of targets."""
+    return [parse_target(target.strip(), default_port)
+            for target in text.split(',') if target.strip()]
+
+def format_target(target):
+    return '{0}:{1}'.format(*target)
+
+
+def connect_exchange(host, port, find_uno=find_ooo.find_uno):
+    return Exchange(host=host, port=port, find_uno=find_uno)
+
+def run_target(target, operation, connect=connect_exchange, timeout=None):
+    """Connects to `target` and calls `operation` with the exchange.
+
+    The work is done in a separate daemon thread
+    so that it can be abandoned after `timeout` seconds;
+    the UNO bridge offers no way to cancel a call in progress.
+
+    Returns a `TargetResult`.
+    """
+    return _run_target(target, operation, connect, timeout)[0]
+
+def _run_target(target, operation, connect, timeout):
+    """Returns the `TargetResult` and the thread, if it was abandoned."""
+    outcome = {}
+    def work():
+        try:
+            outcome['result'] = operation(connect(*target))
+        except Exception as e:
+            outcome['error'] = e
+    start = time.time()
+    thread = threading.Thread(target=work, name=format_target(target))
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    seconds = time.time() - start
+    if thread.is_alive():
+        return TargetResult(target, None, TargetTimeoutError(
+            "No result after {0} seconds.".format(timeout)), seconds), thread
+    return TargetResult(target, outcome.get('result'),
+                        outcome.get('error'), seconds), None
+
+def fan_out(targets, operation, max_workers=8, timeout=None,
+            connect=connect_exchange):
+    """Runs `operation` against every target, up to `max_workers` at a time.
+
+    `operation` is called with an `Exchange` for the target.
+    `connect` is called with a target's host and port to create it.
+    A target that takes longer than `timeout` seconds,
+    including the time to connect, is given up on.
+    Its call carries on in the background,
+    so the worker which ran it takes no more targets,
+    keeping at most `max_workers` connections in use.
+    Targets left over once every worker has stopped that way
+    are recorded as timed out without being started.
+
+    Returns a list of `TargetResult`s in the order of `targets`.
+    Failures are recorded rather than raised.
+    """
+    targets = list(targets)
+    queue = Queue()
+    for index, target in enumerate(targets):
+        queue.put((index, target))
+    results = [None] * len(targets)
+
+    def worker():
+        while True:
+            try:
+                index, target = queue.get_nowait()
+            except Empty:
+                return
+            results[index], abandoned = _run_target(target, operation,
+                                                    connect, timeout)
+            if abandoned is not None:
+                return
+
+    workers = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(targets)))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    for index, result in enumerate(results):
+        if result is None:
+            results[index] = TargetResult(targets[index], None,
+                TargetTimeoutError("Not started; every worker was held up "
+                                   "by a target which timed out."), 0.0)
+    return results
+
+
+def format_results(results):
+    """Yields a report line for each of `results`."""
+    for result in results:
+        if result.error is None:
+            status = 'ok'
+        else:
+            status = 'failed: {0}: {1}'.format(type(result.error).__name__,
+                                               result.error)
+        yield '{0}\t{1:.1f} ms\t{2}\n'.format(format_target(result.target),
+                                              result.seconds * 1000, status)
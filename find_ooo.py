@@ -2,7 +2,43 @@
 
 This is mostly provided as an abstraction
 to make dependency injection more convenient.
+
+Where the `uno` module was found is remembered in a small cache file,
+keyed by the Python interpreter and ``PY_UNO_PATH``,
+so that later runs don't have to search for it.
 """
+import os
+import sys
+
+# ``program`` directories of the usual OpenOffice.org and LibreOffice
+# installations, most likely first.
+program_dir_patterns = [
+    '/usr/lib/libreoffice/program',
+    '/usr/lib64/libreoffice/program',
+    '/opt/libreoffice*/program',
+    '/usr/local/lib/libreoffice/program',
+    '/usr/lib/openoffice/program',
+    '/usr/lib/openoffice/basis*/program',
+    '/usr/lib64/openoffice.org*/program',
+    '/opt/openoffice.org*/program',
+    '/opt/openoffice.org/basis*/program',
+    '/Applications/LibreOffice.app/Contents/Resources',
+    '/Applications/LibreOffice.app/Contents/program',
+    '/Applications/OpenOffice.org.app/Contents/basis-link/program',
+    'C:\\Program Files\\LibreOffice*\\program',
+    'C:\\Program Files (x86)\\LibreOffice*\\program',
+    'C:\\Program Files\\OpenOffice.org*\\program',
+    'C:\\Program Files (x86)\\OpenOffice.org*\\program',
+]
+
+def program_dirs():
+    """Yields existing ``program`` directories which contain ``uno.py``."""
+    from glob import glob
+    for pattern in program_dir_patterns:
+        # Later versions sort last; try them first.
+        for path in sorted(glob(pattern), reverse=True):
+            if os.path.isfile(os.path.join(path, 'uno.py')):
+                yield path
 
 def find_ooo():
     """Returns the path to OpenOffice's ``program`` directory.
@@ -10,21 +46,83 @@ def find_ooo():
     May be useful for systems where the python uno bridge
     is not on the system PYTHONPATH.
     """
-    import os
     try:
         return os.environ['PY_UNO_PATH']
     except KeyError:
-        # Just return the standard debian-ish location for 3.2.
+        for path in program_dirs():
+            return path
+        # Fall back to the standard debian-ish location for 3.2.
         # This is unlikely to ever be useful,
         # since the debian ``python-uno`` module puts `uno` on the PYTHONPATH,
         # but it serves as an example.
         return "/usr/lib/openoffice/basis3.2/program/"
 
+
+# Cache
+
+def cache_path():
+    base = (os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'oomax', 'uno-location')
+
+def cache_key():
+    return '{0}\t{1}'.format(sys.executable, os.environ.get('PY_UNO_PATH', ''))
+
+def read_cache():
+    """Returns the cached location of `uno` for this interpreter.
+
+    The location is a directory to add to the path,
+    or '' if `uno` could be imported without adding one.
+    Returns None if nothing is cached.
+    """
+    key = cache_key()
+    try:
+        with open(cache_path()) as f:
+            for line in f:
+                entry_key, sep, location = line.rstrip('\n').rpartition('\t')
+                if entry_key == key:
+                    return location
+    except IOError:
+        pass
+    return None
+
+def write_cache(location):
+    """Records `location` for this interpreter, keeping other entries.
+
+    Failure to write the cache is ignored.
+    """
+    key = cache_key()
+    path = cache_path()
+    try:
+        with open(path) as f:
+            lines = [line for line in f
+                     if line.rstrip('\n').rpartition('\t')[0] != key]
+    except IOError:
+        lines = []
+    lines.append('{0}\t{1}\n'.format(key, location))
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path + '.tmp', 'w') as f:
+            f.writelines(lines)
+        os.rename(path + '.tmp', path)
+    except (IOError, OSError):
+        pass
+
+
 def find_uno():
+    cached = read_cache()
+    if cached and cached not in sys.path:
+        sys.path.insert(0, cached)
     try:
         import uno
     except ImportError:
-        import sys
-        sys.path.insert(0, find_ooo())
+        location = find_ooo()
+        if location != cached:
+            sys.path.insert(0, location)
         import uno
+        write_cache(location)
+    else:
+        if cached is None:
+            write_cache('')
     return uno
@@ -0,0 +1,248 @@
+"""Start and lease a pool of headless office processes.
+
+An `InstanceManager` launches a number of ``soffice --headless`` workers,
+each with its own user profile and its own pipe or port,
+waits until each one accepts connections,
+and leases their exchanges to callers one at a time.
+Workers which have died are restarted when they are next leased.
+
+    >>> with InstanceManager(4) as manager:
+    ...     results = manager.map(
+    ...         lambda exchange, n: exchange.invoke('Untitled 1',
+    ...                                             'Standard.Heavy.run', [n]),
+    ...         range(100))
+    ... # doctest: +SKIP
+
+The `executable` is configurable, so that a stand-in script can be used,
+typically together with a fake `find_uno`.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from Queue import Queue, Empty
+
+import find_ooo
+import connect
+
+class InstanceError(Exception):
+    """Raised if a worker process can't be started or leased."""
+    pass
+
+
+def free_port():
+    """Returns a TCP port on localhost which is currently unused."""
+    sock = socket.socket()
+    try:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class Worker(object):
+    """One office process and the exchange connected to it."""
+    def __init__(self, name, connect_args, accept, profile_dir):
+        self.name = name
+        self.connect_args = connect_args
+        self.accept = accept
+        self.profile_dir = profile_dir
+        self.process = None
+        self.exchange = None
+        self.restarts = 0
+
+    def is_alive(self):
+        return (self.process is not None and self.process.poll() is None
+                and self.exchange is not None
+                and connect.is_alive(self.exchange.context))
+
+
+class InstanceManager(object):
+    """Runs `count` headless office workers.
+
+    Workers listen on a named pipe each if `transport` is 'pipe',
+    or on a free localhost port each if it is 'socket'.
+    `executable` is the office program and `arguments` are added
+    to the options it is started with.
+    A worker must accept connections within `startup_timeout` seconds.
+    `find_uno` is passed on to `Exchange`.
+    """
+    def __init__(self, count=None, executable='soffice', transport='pipe',
+                 arguments=(), startup_timeout=60, find_uno=find_ooo.find_uno):
+        if transport not in ('pipe', 'socket'):
+            raise ValueError("Unknown transport '{0}'.".format(transport))
+        if count is None:
+            import multiprocessing
+            count = multiprocessing.cpu_count()
+        self.count = count
+        self.executable = executable
+        self.transport = transport
+        self.arguments = list(arguments)
+        self.startup_timeout = startup_timeout
+        self.find_uno = find_uno
+        self.workers = []
+        self._idle = Queue()
+        self._lock = threading.Lock()
+        self._base_dir = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Launches the workers and waits until they are all ready.
+
+        If any worker fails to start, every worker is stopped again
+        before the error is raised.
+        """
+        self._base_dir = tempfile.mkdtemp(prefix='oomax-instances-')
+        try:
+            for i in range(self.count):
+                worker = self._make_worker(i)
+                self.workers.append(worker)
+                self._launch(worker)
+            for worker in self.workers:
+                self._wait_ready(worker)
+                self._idle.put(worker)
+        except:
+            self.stop()
+            raise
+
+    def stop(self):
+        """Terminates every worker and removes their profiles."""
+        for worker in self.workers:
+            self._terminate(worker)
+        self.workers = []
+        self._idle = Queue()
+        if self._base_dir is not None:
+            shutil.rmtree(self._base_dir, ignore_errors=True)
+            self._base_dir = None
+
+    def _make_worker(self, i):
+        name = 'oomax-{0}-{1}'.format(os.getpid(), i)
+        if self.transport == 'pipe':
+            connect_args = dict(pipe=name)
+            accept = 'pipe,name={0};urp;'.format(name)
+        else:
+            port = free_port()
+            connect_args = dict(host='localhost', port=port)
+            accept = 'socket,host=localhost,port={0};urp;'.format(port)
+        profile_dir = os.path.join(self._base_dir, name)
+        return Worker(name, connect_args, accept, profile_dir)
+
+    def command(self, worker):
+        """Returns the command line which starts `worker`."""
+        return [self.executable, '--headless', '--invisible', '--nologo',
+                '--norestore', '--nodefault',
+                # Separate profiles let several instances run at once.
+                '-env:UserInstallation=file://' + worker.profile_dir,
+                '--accept=' + worker.accept] + self.arguments
+
+    def _launch(self, worker):
+        with open(os.devnull, 'w') as devnull:
+            worker.process = subprocess.Popen(self.command(worker),
+                                              stdout=devnull, stderr=devnull)
+        worker.exchange = None
+
+    def _wait_ready(self, worker):
+        from exchange import Exchange
+        deadline = time.time() + self.startup_timeout
+        delay = 0.1
+        while True:
+            if worker.process.poll() is not None:
+                raise InstanceError("Worker {0} exited with status {1}.".format(
+                    worker.name, worker.process.returncode))
+            try:
+                worker.exchange = Exchange(find_uno=self.find_uno,
+                                           **worker.connect_args)
+                return
+            except Exception:
+                if time.time() > deadline:
+                    self._terminate(worker)
+                    raise InstanceError(
+                        "Worker {0} not ready after {1} seconds.".format(
+                            worker.name, self.startup_timeout))
+                time.sleep(delay)
+                delay = min(delay * 2, 1)
+
+    def _terminate(self, worker):
+        process = worker.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            for i in range(50):
+                if process.poll() is not None:
+                    break
+                time.sleep(0.1)
+            else:
+                process.kill()
+                process.wait()
+        worker.exchange = None
+
+    def restart(self, worker):
+        """Replaces `worker`'s process with a fresh one."""
+        self._terminate(worker)
+        worker.restarts += 1
+        self._launch(worker)
+        self._wait_ready(worker)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Hands out an idle worker's `Exchange` for a `with` block.
+
+        Waits up to `timeout` seconds for a worker to become idle.
+        A worker which has died is restarted before it is handed out.
+        """
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except Empty:
+            raise InstanceError("No worker became idle within {0} seconds."
+                                .format(timeout))
+        try:
+            if not worker.is_alive():
+                self.restart(worker)
+            yield worker.exchange
+        finally:
+            self._idle.put(worker)
+
+    def map(self, function, items, timeout=None):
+        """Calls ``function(exchange, item)`` for each item, across workers.
+
+        Returns the results in the order of `items`.
+        The first exception raised by any call is re-raised
+        once all the calls have finished.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        errors = []
+        pending = Queue()
+        for index, item in enumerate(items):
+            pending.put((index, item))
+
+        def run():
+            while True:
+                try:
+                    index, item = pending.get_nowait()
+                except Empty:
+                    return
+                try:
+                    with self.lease(timeout) as exchange:
+                        results[index] = function(exchange, item)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=run)
+                   for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
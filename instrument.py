@@ -0,0 +1,148 @@
+"""Count and time remote UNO calls and the phases of exchange operations.
+
+A `Recorder` wraps UNO objects in `Traced` proxies
+which time every method call and property read made through them.
+Objects returned by those calls are wrapped in turn,
+so wrapping the component context is enough
+to trace everything an `Exchange` does over the bridge.
+Each object is labelled according to how it was obtained,
+for example ``Desktop`` or ``Frames[]``,
+since asking the office for its interface names would add calls.
+
+`null_recorder` does nothing, and is used when nothing is being recorded.
+"""
+import time
+from contextlib import contextmanager
+
+# Values of these types are plain data rather than remote objects.
+plain_types = (basestring, int, long, float, bool, tuple, list, dict,
+               type(None))
+
+def result_label(interface, method, args):
+    """Returns a label for the object returned by `interface`.`method`."""
+    if method.startswith('createInstance') and args:
+        return args[0].rsplit('.', 1)[-1]
+    if method in ('getByName', 'getByIndex'):
+        return interface + '[]'
+    if method.startswith('get') and len(method) > 3:
+        return method[3:]
+    return method
+
+
+class Traced(object):
+    """Proxies a UNO object, recording the calls and reads made on it."""
+    def __init__(self, proxied, recorder, interface):
+        self._proxied = proxied
+        self._recorder = recorder
+        self._interface = interface
+
+    def __getattr__(self, name):
+        recorder, interface = self._recorder, self._interface
+        start = time.time()
+        value = getattr(self._proxied, name)
+        if not callable(value):
+            # Reading a UNO property is a round trip of its own.
+            recorder.record_call(interface, name, time.time() - start)
+            return recorder.wrap(value, name)
+        def traced(*args):
+            args = tuple(unwrap(arg) for arg in args)
+            start = time.time()
+            try:
+                result = value(*args)
+            finally:
+                recorder.record_call(interface, name, time.time() - start)
+            return recorder.wrap(result, result_label(interface, name, args))
+        return traced
+
+    def __repr__(self):
+        return '<Traced {0} {1!r}>'.format(self._interface, self._proxied)
+
+def unwrap(value):
+    """Returns the UNO object behind `value` if it is `Traced`."""
+    if isinstance(value, Traced):
+        return value._proxied
+    return value
+
+
+class NullRecorder(object):
+    """A recorder which records nothing."""
+    def wrap(self, value, interface):
+        return value
+
+    def record_call(self, interface, method, seconds):
+        pass
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+null_recorder = NullRecorder()
+
+
+class Recorder(NullRecorder):
+    """Accumulates call counts and times, by method and by phase.
+
+    `calls` maps ``(interface, method)`` to ``[count, seconds]``,
+    and `phases` maps phase names likewise.
+    """
+    def __init__(self):
+        self.calls = {}
+        self.phases = {}
+
+    def wrap(self, value, interface):
+        if isinstance(value, plain_types) or isinstance(value, Traced):
+            return value
+        return Traced(value, self, interface)
+
+    @staticmethod
+    def _add(totals, key, seconds):
+        entry = totals.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def record_call(self, interface, method, seconds):
+        self._add(self.calls, (interface, method), seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Times the `with` block as an occurrence of phase `name`."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self._add(self.phases, name, time.time() - start)
+
+    def summary(self):
+        """Returns the recorded data in a form suitable for JSON."""
+        def entries(totals, key_name, key=lambda k: k):
+            return [{key_name: key(k), 'count': count, 'seconds': seconds}
+                    for k, (count, seconds) in sorted(totals.iteritems())]
+        return {
+            'phases': entries(self.phases, 'phase'),
+            'calls': entries(self.calls, 'method', '.'.join),
+            'total_calls': sum(count for count, _ in self.calls.itervalues()),
+        }
+
+    def dump(self, f):
+        """Writes the summary to the file `f` as JSON."""
+        import json
+        json.dump(self.summary(), f, indent=1, sort_keys=True)
+        f.write('\n')
+
+    def format(self):
+        """Yields the lines of a human-readable report."""
+        row = '{0:<44} {1:>7} {2:>10} {3:>9}\n'.format
+        def table(heading, entries, key):
+            yield row(heading, 'count', 'total ms', 'mean ms')
+            for entry in sorted(entries, key=lambda e: -e['seconds']):
+                yield row(entry[key], entry['count'],
+                          '{0:.2f}'.format(entry['seconds'] * 1000),
+                          '{0:.3f}'.format(
+                              entry['seconds'] * 1000 / entry['count']))
+        summary = self.summary()
+        for line in table('phase', summary['phases'], 'phase'):
+            yield line
+        yield '\n'
+        for line in table('remote call', summary['calls'], 'method'):
+            yield line
+        yield '{0} remote calls\n'.format(summary['total_calls'])
@@ -11,10 +11,28 @@ class Libraries(container.name_access):
 
     `libraries` is an UNO collection of libraries,
     as returned by `document.get_libraries`.
+
+    Libraries are checked and wrapped the first time they are accessed,
+    and the wrapped library is reused after that.
+    Creating or removing a library through this object
+    drops it from the cache; `refresh` drops everything.
     """
     # TODO: add __setitem__, __delitem__, etc.
     def __init__(self, libraries):
         self._proxied = libraries
+        self._cache = {}
+
+    def refresh(self):
+        """Forgets all libraries accessed so far."""
+        self._cache.clear()
+
+    def createLibrary(self, library_name):
+        self._cache.pop(library_name, None)
+        return self._proxied.createLibrary(library_name)
+
+    def removeLibrary(self, library_name):
+        self._cache.pop(library_name, None)
+        return self._proxied.removeLibrary(library_name)
 
     def __getitem__(self, library_name):
         """Get the library named by `library_name`.
@@ -26,6 +44,13 @@ class Libraries(container.name_access):
         if an attempt is made to access a password-protected library
         and the password has not been verified.
         """
+        try:
+            return self._cache[library_name]
+        except KeyError:
+            lib = self._cache[library_name] = self._open(library_name)
+            return lib
+
+    def _open(self, library_name):
         libs = self._proxied
 
         if not libs.hasByName(library_name):
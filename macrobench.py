@@ -0,0 +1,92 @@
+"""Time Basic macros running in a live office.
+
+Timing is done by `Exchange.time_macro`,
+which leaves connecting and looking up the document and script
+out of the measurements.
+Several macros, or several versions of one macro's module,
+can be timed in the same run for comparison.
+"""
+import math
+
+def percentile(ordered, fraction):
+    """Returns the `fraction` percentile of the sorted list `ordered`.
+
+    Interpolates linearly between the closest ranks.
+    """
+    if not ordered:
+        raise ValueError("No samples.")
+    position = (len(ordered) - 1) * fraction
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position
+                                                                 - lower)
+
+def summarize(samples):
+    """Returns a dict of statistics, in seconds, for `samples`."""
+    ordered = sorted(samples)
+    n = len(ordered)
+    mean = sum(ordered) / n
+    variance = (sum((sample - mean) ** 2 for sample in ordered) / (n - 1)
+                if n > 1 else 0.0)
+    return {
+        'n': n,
+        'mean': mean,
+        'stddev': math.sqrt(variance),
+        'min': ordered[0],
+        'p50': percentile(ordered, 0.5),
+        'p90': percentile(ordered, 0.9),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1],
+    }
+
+
+def bench_macros(exchange, doc_name, macro_names, iterations=100, warmup=5,
+                 args=()):
+    """Times each of `macro_names` in turn.
+
+    Returns a list of ``(macro_name, summary)`` pairs.
+    """
+    return [(macro_name, summarize(exchange.time_macro(
+                doc_name, macro_name, iterations, warmup, args)))
+            for macro_name in macro_names]
+
+def bench_versions(exchange, doc_name, macro_name, sources, iterations=100,
+                   warmup=5, args=()):
+    """Times `macro_name` with each of `sources` pushed as its module.
+
+    `sources` is a list of ``(label, source)`` pairs,
+    each source being anything `Exchange.push` accepts.
+    The module's original text is put back afterwards, exactly as it was.
+
+    Returns a list of ``(label, summary)`` pairs.
+    """
+    library_name, module_name = macro_name.split('.')[:2]
+    original = exchange.pull_text(doc_name, library_name, module_name)
+    results = []
+    try:
+        for label, source in sources:
+            exchange.push(doc_name, library_name, module_name, source)
+            results.append((label, summarize(exchange.time_macro(
+                doc_name, macro_name, iterations, warmup, args))))
+    finally:
+        with exchange.batch(doc_name) as batch:
+            batch.set_text(library_name, module_name, original)
+    return results
+
+
+def format_results(results, heading='macro'):
+    """Yields the lines of a table of `results`, times in milliseconds.
+
+    Each row after the first also gives its mean relative to the first.
+    """
+    columns = ('mean', 'stddev', 'min', 'p50', 'p90', 'p99', 'max')
+    header = '{0:<32} {1:>6} ' + ' '.join('{0:>9}'.format(c) for c in columns)
+    yield header.format(heading, 'n') + '  relative\n'
+    baseline = results[0][1]['mean'] if results else None
+    for label, summary in results:
+        cells = ' '.join('{0:>9.3f}'.format(summary[c] * 1000)
+                         for c in columns)
+        relative = ('x{0:.2f}'.format(summary['mean'] / baseline)
+                    if baseline else '')
+        yield '{0:<32} {1:>6} {2}  {3}\n'.format(label, summary['n'], cells,
+                                                 relative)
@@ -0,0 +1,223 @@
+"""Search the Basic code of every open document without asking the office.
+
+`build_index` reads every module of every open document,
+and optionally the application's own libraries, over one connection,
+and records them in a `MacroIndex`.
+The index is saved to a file,
+so that `MacroIndex.grep` and `MacroIndex.where_defined`
+can answer later without connecting at all.
+
+Alongside the module texts, the file holds two inverted indexes:
+the modules using each word,
+and where each Sub, Function or Property is defined.
+When the index is rebuilt, modules whose text hashes the same
+as last time keep their entries rather than being analysed again.
+"""
+import json
+import os
+import re
+
+from manifest import source_hash
+
+# Basic is case-insensitive, so words and names are indexed in lower case.
+word_pattern = re.compile(r'[^\W\d]\w*', re.UNICODE)
+definition_pattern = re.compile(
+    r'\s*(?:(?:public|private|static)\s+)*'
+    r'(?:sub|function|property\s+(?:get|let|set))\s+(\w+)',
+    re.IGNORECASE | re.UNICODE)
+
+def default_path():
+    base = (os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'oomax', 'macro-index.json')
+
+def words(text):
+    """Returns the set of lower-cased words in `text`."""
+    return set(word.lower() for word in word_pattern.findall(text))
+
+def definitions(text):
+    """Returns ``(name, line_number)`` for each procedure defined in `text`.
+
+    Names are lower-cased and line numbers start at 1.
+    """
+    found = []
+    for number, line in enumerate(text.splitlines(), 1):
+        match = definition_pattern.match(line)
+        if match:
+            found.append((match.group(1).lower(), number))
+    return found
+
+
+class Entry(object):
+    """One module's text, hash, words and definitions."""
+    __slots__ = ('location', 'hash', 'text', 'words', 'definitions')
+
+    def __init__(self, location, text, digest=None, words_=None,
+                 definitions_=None):
+        self.location = location
+        self.text = text
+        self.hash = digest or source_hash(text)
+        self.words = words(text) if words_ is None else words_
+        self.definitions = (definitions(text) if definitions_ is None
+                            else definitions_)
+
+    def line(self, number):
+        return self.text.splitlines()[number - 1]
+
+
+class MacroIndex(object):
+    """The modules of a set of documents, keyed by location.
+
+    A location is a ``(document, library, module)`` tuple.
+    Changes are only written to `path` when `save` is called.
+    """
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('version') != self.version:
+            return
+        modules = data['modules']
+        module_words = [set() for module in modules]
+        for word, ids in data['words'].iteritems():
+            for i in ids:
+                module_words[i].add(word)
+        module_definitions = [[] for module in modules]
+        for name, places in data['definitions'].iteritems():
+            for i, number in places:
+                module_definitions[i].append((name, number))
+        for i, (doc_name, library_name, module_name, digest,
+                text) in enumerate(modules):
+            location = doc_name, library_name, module_name
+            self.entries[location] = Entry(location, text, digest,
+                                           module_words[i],
+                                           module_definitions[i])
+
+    def save(self):
+        ordered = sorted(self.entries.values(), key=lambda e: e.location)
+        word_ids = {}
+        definition_places = {}
+        for i, entry in enumerate(ordered):
+            for word in entry.words:
+                word_ids.setdefault(word, []).append(i)
+            for name, number in entry.definitions:
+                definition_places.setdefault(name, []).append((i, number))
+        data = {
+            'version': self.version,
+            'modules': [list(entry.location) + [entry.hash, entry.text]
+                        for entry in ordered],
+            'words': word_ids,
+            'definitions': definition_places,
+        }
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.rename(tmp_path, self.path)
+
+    def replace(self, modules):
+        """Replaces the indexed modules with `modules`.
+
+        `modules` is an iterable of ``(location, text)`` pairs.
+        Entries for unchanged text are kept as they are.
+
+        Returns a dict counting the modules
+        ``added``, ``changed``, ``unchanged`` and ``removed``.
+        """
+        counts = dict(added=0, changed=0, unchanged=0, removed=0)
+        old = self.entries
+        self.entries = {}
+        for location, text in modules:
+            entry = old.pop(location, None)
+            if entry is not None and entry.hash == source_hash(text):
+                counts['unchanged'] += 1
+            else:
+                counts['changed' if entry is not None else 'added'] += 1
+                entry = Entry(location, text)
+            self.entries[location] = entry
+        counts['removed'] = len(old)
+        return counts
+
+    def where_defined(self, name):
+        """Yields ``(location, line_number, line)`` where `name` is defined."""
+        name = name.lower()
+        for location in sorted(self.entries):
+            entry = self.entries[location]
+            for defined, number in entry.definitions:
+                if defined == name:
+                    yield location, number, entry.line(number)
+
+    def grep(self, pattern, ignore_case=False):
+        """Yields ``(location, line_number, line)`` for each matching line.
+
+        If `pattern` is a plain run of word characters
+        which doesn't start with a digit,
+        only the modules with an indexed word containing it are searched.
+        Any match of such a pattern lies within a word,
+        since words run from their first non-digit character.
+        """
+        regex = re.compile(pattern, re.UNICODE
+                           | (re.IGNORECASE if ignore_case else 0))
+        if word_pattern.match(pattern) and re.match(r'\w+$', pattern,
+                                                    re.UNICODE):
+            part = pattern.lower()
+            locations = [location for location, entry
+                         in self.entries.iteritems()
+                         if any(part in word for word in entry.words)]
+        else:
+            locations = self.entries
+        for location in sorted(locations):
+            for number, line in enumerate(
+                    self.entries[location].text.splitlines(), 1):
+                if regex.search(line):
+                    yield location, number, line
+
+
+def format_match(location, number, line):
+    return u'{0}:{1}.{2}:{3}: {4}\n'.format(location[0], location[1],
+                                            location[2], number, line)
+
+
+def read_modules(exchange, include_application=False, report_error=None):
+    """Yields ``(location, text)`` for every module in the open documents.
+
+    Documents are read within one transaction.
+    The application's libraries are read as the document 'application'
+    if `include_application` is truthy.
+    A document which can't be read is skipped,
+    after calling `report_error` with its name and the exception.
+    """
+    doc_names = exchange.documents.names()
+    if include_application:
+        doc_names.append('application')
+    with exchange.transaction():
+        for doc_name in doc_names:
+            try:
+                modules = list(exchange.pull_modules(doc_name))
+            except Exception as e:
+                if report_error is not None:
+                    report_error(doc_name, e)
+                continue
+            for library_name, module_name, text in modules:
+                yield (doc_name, library_name, module_name), text
+
+def build_index(exchange, path, include_application=False,
+                report_error=None):
+    """Refreshes the index at `path` from the open documents and saves it.
+
+    Returns the counts from `MacroIndex.replace`.
+    """
+    index = MacroIndex(path)
+    counts = index.replace(read_modules(exchange, include_application,
+                                        report_error))
+    index.save()
+    return counts
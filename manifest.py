@@ -0,0 +1,47 @@
+"""Record what was last pushed so that unchanged modules can be skipped.
+
+The manifest is a JSON file mapping document names
+to a mapping of ``Library.Module`` names to hashes of the module text.
+"""
+import hashlib
+import json
+import os
+
+def source_hash(text):
+    """Returns a hex digest of the module `text`."""
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+class Manifest(object):
+    """The hashes of the modules last pushed to each document.
+
+    Changes are only written to `path` when `save` is called.
+    """
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            with open(path) as f:
+                self._docs = json.load(f)
+        else:
+            self._docs = {}
+
+    @staticmethod
+    def _key(library_name, module_name):
+        return '{0}.{1}'.format(library_name, module_name)
+
+    def get(self, doc_name, library_name, module_name):
+        """Returns the recorded hash, or None if there isn't one."""
+        modules = self._docs.get(doc_name, {})
+        return modules.get(self._key(library_name, module_name))
+
+    def set(self, doc_name, library_name, module_name, digest):
+        modules = self._docs.setdefault(doc_name, {})
+        modules[self._key(library_name, module_name)] = digest
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._docs, f, indent=1, sort_keys=True)
+        os.rename(tmp_path, self.path)
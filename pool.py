@@ -0,0 +1,167 @@
+"""Reuse `Exchange` connections in long-running processes.
+
+An `ExchangePool` keeps idle exchanges keyed by their connection arguments.
+Before one is handed out again,
+a single cheap remote call checks that its office is still there;
+dead or long-idle exchanges are dropped and replaced.
+New connections are retried with exponential backoff.
+
+    >>> pool = ExchangePool()
+    >>> with pool.connection(host='build1', port='2002') as exchange:
+    ...     exchange.push('Untitled 1', 'Standard', 'Module1', source)
+    ... # doctest: +SKIP
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import connect
+
+class ExchangePool(object):
+    """A pool of `Exchange` objects keyed by connection arguments.
+
+    `connect_exchange` is called with the connection arguments
+    to make a new exchange; it defaults to `Exchange` itself.
+    Exchanges idle for more than `max_idle` seconds are dropped.
+    Connecting is tried up to `attempts` times,
+    waiting `backoff` seconds after the first failure
+    and twice as long after each further one.
+
+    Each exchange is only ever leased to one caller at a time,
+    since the UNO bridge isn't free-threaded.
+    """
+    def __init__(self, connect_exchange=None, max_idle=300, attempts=3,
+                 backoff=0.5, clock=time.time, sleep=time.sleep):
+        if connect_exchange is None:
+            from exchange import Exchange
+            connect_exchange = Exchange
+        self._connect = connect_exchange
+        self.max_idle = max_idle
+        self.attempts = attempts
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self._idle = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.counts = dict(hits=0, misses=0, evictions=0, connects=0,
+                           connect_failures=0)
+        self.connect_seconds = 0.0
+
+    @staticmethod
+    def _key(kwargs):
+        return tuple(sorted(kwargs.iteritems()))
+
+    def acquire(self, **kwargs):
+        """Returns an exchange for the connection arguments `kwargs`.
+
+        The exchange must be handed back with `release`.
+        """
+        key = self._key(kwargs)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                exchange, since = idle.pop()
+            if (self._clock() - since > self.max_idle
+                or not connect.is_alive(exchange.context)):
+                self._drop(exchange)
+                continue
+            self._count('hits')
+            return exchange
+        self._count('misses')
+        exchange = self._connect_with_backoff(kwargs)
+        with self._lock:
+            self._keys[id(exchange)] = key
+        return exchange
+
+    def release(self, exchange, broken=False):
+        """Returns `exchange` to the pool.
+
+        If `broken` is truthy, it is dropped instead.
+        """
+        if broken:
+            self._drop(exchange)
+            return
+        with self._lock:
+            key = self._keys[id(exchange)]
+            self._idle.setdefault(key, []).append((exchange, self._clock()))
+
+    @contextmanager
+    def connection(self, **kwargs):
+        """Leases an exchange for the duration of a `with` block.
+
+        If the block raises and the office has stopped answering,
+        the exchange is dropped rather than returned to the pool.
+        """
+        exchange = self.acquire(**kwargs)
+        try:
+            yield exchange
+        except Exception:
+            self.release(exchange,
+                         broken=not connect.is_alive(exchange.context))
+            raise
+        else:
+            self.release(exchange)
+
+    def evict_idle(self):
+        """Drops every exchange that has been idle for too long."""
+        now = self._clock()
+        with self._lock:
+            expired = []
+            for key, idle in self._idle.items():
+                keep = [(e, since) for e, since in idle
+                        if now - since <= self.max_idle]
+                expired.extend(e for e, since in idle
+                               if now - since > self.max_idle)
+                self._idle[key] = keep
+        for exchange in expired:
+            self._drop(exchange)
+
+    def clear(self):
+        """Drops every idle exchange."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for exchange, since in entries:
+                self._drop(exchange)
+
+    def stats(self):
+        """Returns a dict of hit, miss, eviction and connection counts.
+
+        ``connect_seconds`` is the total time spent making connections,
+        and ``idle`` the number of exchanges waiting in the pool.
+        """
+        with self._lock:
+            stats = dict(self.counts)
+            stats['connect_seconds'] = self.connect_seconds
+            stats['idle'] = sum(len(idle) for idle in self._idle.values())
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _drop(self, exchange):
+        with self._lock:
+            self._keys.pop(id(exchange), None)
+            self.counts['evictions'] += 1
+
+    def _connect_with_backoff(self, kwargs):
+        delay = self.backoff
+        for attempt in range(self.attempts):
+            start = self._clock()
+            try:
+                exchange = self._connect(**kwargs)
+            except Exception:
+                self._count('connect_failures')
+                if attempt == self.attempts - 1:
+                    raise
+                self._sleep(delay)
+                delay *= 2
+            else:
+                with self._lock:
+                    self.counts['connects'] += 1
+                    self.connect_seconds += self._clock() - start
+                return exchange
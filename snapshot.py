@@ -0,0 +1,197 @@
+"""Save a document's Basic modules to an archive, and restore them.
+
+An archive starts with the 8 bytes ``OOMAXSN1``,
+then the length of the header as a 4-byte big-endian integer,
+then the header, which is JSON,
+and then the UTF-8 text of each module, one after another.
+The header names the document and lists each module as
+``[library, module, offset, length, hash]``,
+with offsets counted from the end of the header.
+
+`Snapshot` memory-maps the archive,
+so a single module can be read without loading the rest.
+
+    >>> take_snapshot(exchange, 'Template', 'template.oomax')
+    >>> restore_snapshot(exchange, 'Untitled 1', 'template.oomax', save=True)
+    ... # doctest: +SKIP
+"""
+import json
+import mmap
+import os
+import struct
+
+from manifest import source_hash
+
+magic = 'OOMAXSN1'
+length_format = '>I'
+
+class SnapshotFormatError(Exception):
+    """Raised if a file isn't a snapshot archive."""
+    pass
+
+
+def write_snapshot(path, modules, doc_name=None):
+    """Writes an archive of `modules` to `path`.
+
+    `modules` is an iterable of ``(library_name, module_name, text)``.
+
+    Returns the number of modules written.
+    """
+    index = []
+    texts = []
+    offset = 0
+    for library_name, module_name, text in modules:
+        data = text.encode('utf-8') if isinstance(text, unicode) else text
+        index.append((library_name, module_name, offset, len(data),
+                      source_hash(text)))
+        texts.append(data)
+        offset += len(data)
+    header = json.dumps({'document': doc_name, 'modules': index},
+                        separators=(',', ':'))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(magic)
+        f.write(struct.pack(length_format, len(header)))
+        f.write(header)
+        for data in texts:
+            f.write(data)
+    os.rename(tmp_path, path)
+    return len(index)
+
+
+class Entry(object):
+    """Where one module is in an archive."""
+    __slots__ = ('library_name', 'module_name', 'offset', 'length', 'hash')
+
+    def __init__(self, library_name, module_name, offset, length, digest):
+        self.library_name = library_name
+        self.module_name = module_name
+        self.offset = offset
+        self.length = length
+        self.hash = digest
+
+
+class Snapshot(object):
+    """A memory-mapped snapshot archive.
+
+    Iterating over it yields ``(library_name, module_name, text)``.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            # Empty files can't be mapped.
+            self._file.close()
+            raise SnapshotFormatError("'{0}' is empty.".format(path))
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        prefix_length = len(magic) + struct.calcsize(length_format)
+        prefix = self._map[:prefix_length]
+        if len(prefix) < prefix_length or not prefix.startswith(magic):
+            raise SnapshotFormatError(
+                "'{0}' is not a snapshot archive.".format(self.path))
+        header_length, = struct.unpack(length_format, prefix[len(magic):])
+        self._data_start = prefix_length + header_length
+        try:
+            header = json.loads(self._map[prefix_length:self._data_start])
+            self.document = header['document']
+            self.entries = [Entry(*module) for module in header['modules']]
+            end = max([self._data_start] + [
+                self._data_start + entry.offset + entry.length
+                for entry in self.entries])
+        except (ValueError, KeyError, TypeError) as e:
+            raise SnapshotFormatError(
+                "'{0}' has a corrupt header: {1}".format(self.path, e))
+        if end > len(self._map):
+            raise SnapshotFormatError(
+                "'{0}' is truncated.".format(self.path))
+        self._entries = dict(((e.library_name, e.module_name), e)
+                             for e in self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def library_names(self):
+        """Returns the names of the libraries with modules in the archive."""
+        names = []
+        for entry in self.entries:
+            if entry.library_name not in names:
+                names.append(entry.library_name)
+        return names
+
+    def read(self, library_name, module_name):
+        """Returns the text of one module.
+
+        Raises KeyError if the archive doesn't hold it.
+        """
+        return self.entry_text(self._entries[library_name, module_name])
+
+    def entry_text(self, entry):
+        """Returns the text of the module at `entry`."""
+        start = self._data_start + entry.offset
+        return self._map[start:start + entry.length].decode('utf-8')
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield entry.library_name, entry.module_name, self.entry_text(entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def take_snapshot(exchange, doc_name, path):
+    """Writes every readable module of `doc_name` to the archive at `path`.
+
+    Password-protected libraries are left out.
+    Returns the number of modules written.
+    """
+    return write_snapshot(path, exchange.pull_modules(doc_name), doc_name)
+
+def restore_snapshot(exchange, doc_name, path, save=False,
+                     only_changed=False):
+    """Puts the modules in the archive at `path` into `doc_name`.
+
+    Everything is done in one `Exchange.batch`:
+    the document is looked up once, missing libraries are created together,
+    and the document is saved or marked modified once.
+    Modules which aren't in the archive are left alone.
+
+    If `only_changed` is truthy, the document's modules are read first,
+    and only those whose text differs from the archive's are written.
+    If nothing differs, the document isn't touched.
+
+    Returns a list of the ``(library_name, module_name)`` written.
+    """
+    restored = []
+    with Snapshot(path) as snapshot:
+        with exchange.batch(doc_name, save=save) as batch:
+            live = {}
+            if only_changed:
+                library_names = [name for name in snapshot.library_names()
+                                 if name in batch.libs]
+                for library_name, module_name, text in exchange.pull_modules(
+                        doc_name, library_names):
+                    live[library_name, module_name] = source_hash(text)
+            for entry in snapshot.entries:
+                key = entry.library_name, entry.module_name
+                if only_changed and live.get(key) == entry.hash:
+                    continue
+                batch.set_text(entry.library_name, entry.module_name,
+                               snapshot.entry_text(entry))
+                restored.append(key)
+    return restored
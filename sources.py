@@ -0,0 +1,77 @@
+"""Convert between source files and the text of Basic modules.
+
+A module's text is held by the office as one string.
+These functions go between that and files
+without building a list of lines or more whole copies than needed,
+which matters for modules of several megabytes.
+"""
+
+def join_source(source):
+    """Joins the lines of `source` into the text of a module."""
+    return '\n'.join(line.rstrip('\n') for line in source)
+
+def normalise_source(text):
+    """Returns the module text for the contents of a source file.
+
+    Windows and old Mac OS line endings become newlines,
+    and one final newline is dropped, as `join_source` would.
+    """
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if text.endswith('\n'):
+        text = text[:-1]
+    return text
+
+def read_source(source):
+    """Returns the contents of `source` as a single string.
+
+    `source` may be a string, a file, which is read in one go,
+    or an iterable of lines.
+    """
+    if isinstance(source, basestring):
+        return source
+    if hasattr(source, 'read'):
+        return source.read()
+    return ''.join(source)
+
+def read_source_file(path, encoding='utf-8'):
+    """Returns the contents of the file at `path` decoded as unicode.
+
+    The office holds module text as unicode,
+    so non-ASCII characters must arrive as such.
+    """
+    with open(path) as f:
+        return f.read().decode(encoding)
+
+def source_text(source):
+    """Returns the module text for `source`.
+
+    `source` may be a string or a file, as for `read_source`,
+    or an iterable of lines with or without their newlines.
+    """
+    if isinstance(source, basestring) or hasattr(source, 'read'):
+        return normalise_source(read_source(source))
+    return join_source(source)
+
+
+def source_lines(text):
+    """Yields the lines of module `text`, each ending in a newline."""
+    return (line + "\n" for line in text.rstrip('\n').split('\n'))
+
+def write_source(text, f, chunk_size=1 << 20, encoding='utf-8'):
+    """Writes module `text` to the file `f`, ending with one newline.
+
+    The office gives module text as unicode,
+    which is encoded with `encoding` for the byte file `f`.
+    The text is written in slices of `chunk_size` characters,
+    so the largest extra copy made is one slice.
+    """
+    end = len(text)
+    while end and text[end - 1] == '\n':
+        end -= 1
+    for start in xrange(0, end, chunk_size):
+        chunk = text[start:min(start + chunk_size, end)]
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode(encoding)
+        f.write(chunk)
+    f.write('\n')
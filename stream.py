@@ -0,0 +1,117 @@
+"""Run a stream of push, pull and invoke commands over one connection.
+
+Each command is a JSON object on a line of its own, for example::
+
+    {"command": "push", "document": "Untitled 1",
+     "macro": "Standard.Module1", "file": "module1.bas", "save": true}
+    {"command": "pull", "document": "Untitled 1", "macro": "Standard.Module1"}
+    {"command": "invoke", "document": "Untitled 1",
+     "macro": "Standard.Module1.main", "args": [1, 2], "id": 3}
+
+A push takes its code from ``source`` or from ``file``;
+a pull writes to ``file`` if one is given,
+and otherwise returns the code as ``text``.
+
+Commands are run in order within one `Exchange.transaction`,
+so each document is only looked up once,
+and a result is produced for each command as soon as it has run.
+"""
+import json
+import time
+
+from document import plain_value
+from sources import write_source
+
+class CommandError(Exception):
+    """Raised if a command line can't be understood."""
+    pass
+
+
+def split_macro(command, parts):
+    """Returns the first `parts` components of the command's macro name."""
+    names = command.get('macro', '').split('.')
+    if len(names) < parts:
+        raise CommandError("'macro' must have at least {0} parts.".format(
+            parts))
+    return names[:parts]
+
+
+# Commands
+#
+# Each takes an exchange, the document name and the command,
+# and returns a dict of items to add to the result.
+
+def push(exchange, doc_name, command):
+    library_name, module_name = split_macro(command, 2)
+    if 'source' in command:
+        source = command['source']
+    elif 'file' in command:
+        with open(command['file']) as f:
+            source = f.read()
+    else:
+        raise CommandError("push needs a 'source' or a 'file'.")
+    exchange.push(doc_name, library_name, module_name, source,
+                  save=command.get('save', False))
+    return {}
+
+def pull(exchange, doc_name, command):
+    library_name, module_name = split_macro(command, 2)
+    text = exchange.pull_text(doc_name, library_name, module_name)
+    if 'file' in command:
+        with open(command['file'], 'w') as f:
+            write_source(text, f)
+        return {}
+    return {'text': text.rstrip('\n') + '\n'}
+
+def invoke(exchange, doc_name, command):
+    split_macro(command, 3)
+    return {'result': plain_value(exchange.invoke(
+        doc_name, command['macro'], command.get('args', ())))}
+
+commands = {'push': push, 'pull': pull, 'invoke': invoke}
+
+
+def run_command(exchange, line, doc_name=None):
+    """Runs the command on `line`, carrying on past failures.
+
+    `doc_name` is used if the command doesn't name a document.
+
+    Returns the result as a dict
+    with a ``status`` of 'ok' or 'error' and the ``seconds`` taken.
+    """
+    start = time.time()
+    result = {}
+    try:
+        command = json.loads(line)
+        if not isinstance(command, dict):
+            raise CommandError("A command must be a JSON object.")
+        for key in ('id', 'command', 'macro'):
+            if key in command:
+                result[key] = command[key]
+        doc_name = command.get('document', doc_name)
+        if doc_name is None:
+            raise CommandError("No 'document' given.")
+        result['document'] = doc_name
+        try:
+            function = commands[command.get('command')]
+        except KeyError:
+            raise CommandError("Unknown command {0!r}.".format(
+                command.get('command')))
+        result.update(function(exchange, doc_name, command))
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = '{0}: {1}'.format(type(e).__name__, e)
+    else:
+        result['status'] = 'ok'
+    result['seconds'] = time.time() - start
+    return result
+
+def run_stream(exchange, lines, doc_name=None):
+    """Runs the command on each non-blank line of `lines`.
+
+    Yields each command's result before the next line is read.
+    """
+    with exchange.transaction():
+        for line in lines:
+            if line.strip():
+                yield run_command(exchange, line, doc_name)
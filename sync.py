@@ -0,0 +1,102 @@
+"""Mirror a whole directory tree of Basic source to or from a document.
+
+The tree is laid out as ``<directory>/<Library>/<Module>.bas``.
+Everything is done over one connection with one document lookup.
+"""
+import os
+import time
+
+from sources import read_source_file, source_text, write_source
+from manifest import Manifest, source_hash
+
+extension = '.bas'
+manifest_name = '.oomax-manifest'
+
+def read_tree(directory):
+    """Yields ``(library_name, module_name, path)`` for each module file."""
+    for library_name in sorted(os.listdir(directory)):
+        library_dir = os.path.join(directory, library_name)
+        if not os.path.isdir(library_dir):
+            continue
+        for filename in sorted(os.listdir(library_dir)):
+            module_name, ext = os.path.splitext(filename)
+            if ext == extension:
+                yield (library_name, module_name,
+                       os.path.join(library_dir, filename))
+
+def module_path(directory, library_name, module_name):
+    return os.path.join(directory, library_name, module_name + extension)
+
+
+def sync_push(exchange, doc_name, directory, save=False,
+              incremental=False, verify=False):
+    """Pushes every module file under `directory` into `doc_name`.
+
+    If `incremental` is truthy, modules whose text hashes the same
+    as when they were last pushed are skipped.
+    The hashes are kept in a manifest file at the top of `directory`.
+    If nothing has changed, the document isn't touched at all.
+
+    If `verify` is also truthy, the document's modules are pulled
+    and hashed first, and any which have drifted from the manifest
+    are pushed again.
+
+    Files are read as UTF-8.
+
+    Returns the per-module timings from `Exchange.push_modules`.
+    """
+    modules = [(library_name, module_name, read_source_file(path))
+               for library_name, module_name, path in read_tree(directory)]
+    if not incremental:
+        return exchange.push_modules(doc_name, modules, save=save)
+
+    manifest = Manifest(os.path.join(directory, manifest_name))
+    if verify:
+        remote = dict(((library_name, module_name), source_hash(text))
+                      for library_name, module_name, text
+                      in exchange.pull_modules(doc_name))
+    changed = []
+    for library_name, module_name, source in modules:
+        digest = source_hash(source_text(source))
+        if (digest != manifest.get(doc_name, library_name, module_name)
+            or verify and digest != remote.get((library_name, module_name))):
+            changed.append((library_name, module_name, source, digest))
+    if not changed:
+        return []
+
+    timings = exchange.push_modules(doc_name, (m[:3] for m in changed),
+                                    save=save)
+    for library_name, module_name, source, digest in changed:
+        manifest.set(doc_name, library_name, module_name, digest)
+    manifest.save()
+    return timings
+
+def sync_pull(exchange, doc_name, directory):
+    """Writes every module of `doc_name` to a file under `directory`.
+
+    Files are written as UTF-8.
+
+    Returns a list of ``(library_name, module_name, seconds)``;
+    the time includes fetching the module and writing its file.
+    """
+    timings = []
+    start = time.time()
+    for library_name, module_name, text in exchange.pull_modules(doc_name):
+        path = module_path(directory, library_name, module_name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            write_source(text, f)
+        now = time.time()
+        timings.append((library_name, module_name, now - start))
+        start = now
+    return timings
+
+
+def format_timings(timings):
+    """Yields report lines for `timings`, followed by a total."""
+    for library_name, module_name, seconds in timings:
+        yield '{0}.{1}\t{2:.1f} ms\n'.format(library_name, module_name,
+                                             seconds * 1000)
+    yield '{0} modules\t{1:.1f} ms\n'.format(
+        len(timings), sum(t[2] for t in timings) * 1000)
@@ -0,0 +1,39 @@
+"""Tests of `async_exchange.AsyncExchange` against a `fake_uno.FakeOffice`."""
+import unittest
+
+from async_exchange import AsyncExchange
+from fake_uno import FakeOffice
+
+class AsyncExchangeTest(unittest.TestCase):
+    def setUp(self):
+        self.office = FakeOffice()
+        self.doc = self.office.add_document('Doc', {'Standard': {
+            'Module1': u'sub main\nend sub'}})
+        self.office.macros['Standard.Module1.add'] = lambda a, b: a + b
+        self.remote = AsyncExchange(find_uno=self.office.find_uno)
+
+    def tearDown(self):
+        self.remote.close()
+
+    def test_invoke_with_args(self):
+        future = self.remote.invoke('Doc', 'Standard.Module1.add', [1, 2])
+        self.assertEqual(future.result(5), 3)
+
+    def test_invoke_many(self):
+        calls = iter([('Doc', 'Standard.Module1.add', [1, 2]),
+                      ('Nowhere', 'Standard.Module1.add', [3, 4]),
+                      ('Doc', 'Standard.Module1.add', (5, 6))])
+        results = self.remote.invoke_many(calls).result(5)
+        self.assertEqual([(result, error is None)
+                          for result, error, seconds in results],
+                         [(3, True), (None, False), (11, True)])
+
+    def test_push_and_pull(self):
+        self.remote.push('Doc', 'Standard', 'Module1', 'a\nb\n').result(5)
+        self.assertEqual(
+            self.remote.pull('Doc', 'Standard', 'Module1').result(5),
+            ['a\n', 'b\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Round trip counts of the container snapshots, against `fake_uno`.
+
+Run with ``python -m unittest discover`` from the package directory.
+"""
+import unittest
+
+from container import (index_snapshot, name_snapshot,
+                       name_container_snapshot)
+from fake_uno import FakeOffice, FakeIndexAccess, FakeNameContainer
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.office = FakeOffice()
+
+    def assertRoundTrips(self, expected, function, *args):
+        """Calls `function` and checks how many round trips it made."""
+        self.office.reset_counts()
+        result = function(*args)
+        self.assertEqual(self.office.round_trips, expected,
+                         'made {0}'.format(self.office.calls))
+        return result
+
+
+class IndexSnapshotTest(SnapshotTestCase):
+    def setUp(self):
+        SnapshotTestCase.setUp(self)
+        self.proxied = FakeIndexAccess(self.office, ['a', 'b', 'c'])
+        self.office.reset_counts()
+        self.snapshot = index_snapshot(self.proxied)
+
+    def test_fetches_everything_up_front(self):
+        # getCount and one getByIndex per element.
+        self.assertEqual(self.office.round_trips, 4)
+
+    def test_queries_are_local(self):
+        snapshot = self.snapshot
+        self.assertEqual(self.assertRoundTrips(0, len, snapshot), 3)
+        self.assertEqual(self.assertRoundTrips(0, list, snapshot),
+                         ['a', 'b', 'c'])
+        self.assertTrue(self.assertRoundTrips(0, snapshot.__contains__, 'b'))
+        self.assertEqual(self.assertRoundTrips(0, snapshot.__getitem__, 2),
+                         'c')
+        self.assertRaises(IndexError, snapshot.__getitem__, 3)
+        self.assertEqual(self.office.round_trips, 0)
+
+    def test_refresh(self):
+        self.proxied._items.append('d')
+        self.assertRoundTrips(5, self.snapshot.refresh)
+        self.assertEqual(list(self.snapshot), ['a', 'b', 'c', 'd'])
+
+
+class NameSnapshotTest(SnapshotTestCase):
+    def setUp(self):
+        SnapshotTestCase.setUp(self)
+        self.proxied = FakeNameContainer(self.office, {'A': 1, 'B': 2})
+        self.office.reset_counts()
+
+    def test_names_up_front(self):
+        snapshot = self.assertRoundTrips(1, name_snapshot, self.proxied)
+        self.assertEqual(self.assertRoundTrips(0, len, snapshot), 2)
+        self.assertEqual(self.assertRoundTrips(0, sorted, snapshot),
+                         ['A', 'B'])
+        self.assertTrue(self.assertRoundTrips(0, snapshot.__contains__, 'A'))
+        self.assertFalse(self.assertRoundTrips(0, snapshot.__contains__, 'Z'))
+
+    def test_getitem_fetches_once(self):
+        snapshot = name_snapshot(self.proxied)
+        self.assertEqual(self.assertRoundTrips(1, snapshot.__getitem__, 'A'),
+                         1)
+        self.assertEqual(self.assertRoundTrips(0, snapshot.__getitem__, 'A'),
+                         1)
+
+    def test_getitem_miss_is_local(self):
+        snapshot = name_snapshot(self.proxied)
+        self.office.reset_counts()
+        self.assertRaises(KeyError, snapshot.__getitem__, 'Z')
+        self.assertEqual(self.office.round_trips, 0)
+
+    def test_prefetch(self):
+        snapshot = self.assertRoundTrips(3, name_snapshot, self.proxied, True)
+        self.assertEqual(self.assertRoundTrips(0, snapshot.__getitem__, 'B'),
+                         2)
+
+    def test_refresh_discards_fetched_elements(self):
+        snapshot = name_snapshot(self.proxied)
+        snapshot['A']
+        self.proxied._elements['A'] = 10
+        self.proxied._elements['C'] = 3
+        self.assertRoundTrips(1, snapshot.refresh)
+        self.assertTrue('C' in snapshot)
+        self.assertEqual(self.assertRoundTrips(1, snapshot.__getitem__, 'A'),
+                         10)
+
+
+class NameContainerSnapshotTest(SnapshotTestCase):
+    def setUp(self):
+        SnapshotTestCase.setUp(self)
+        self.proxied = FakeNameContainer(self.office, {'A': 1})
+        self.snapshot = name_container_snapshot(self.proxied)
+
+    def test_replace_is_one_call(self):
+        self.assertRoundTrips(1, self.snapshot.__setitem__, 'A', 5)
+        self.assertEqual(self.office.calls, {('FakeNameContainer',
+                                              'replaceByName'): 1})
+        self.assertEqual(self.proxied._elements['A'], 5)
+        self.assertEqual(self.assertRoundTrips(0, self.snapshot.__getitem__,
+                                               'A'), 5)
+
+    def test_insert_is_one_call(self):
+        self.assertRoundTrips(1, self.snapshot.__setitem__, 'B', 2)
+        self.assertEqual(self.office.calls, {('FakeNameContainer',
+                                              'insertByName'): 1})
+        self.assertTrue(self.assertRoundTrips(0, self.snapshot.__contains__,
+                                              'B'))
+        self.assertEqual(self.proxied._elements['B'], 2)
+
+    def test_delete_is_one_call(self):
+        self.assertRoundTrips(1, self.snapshot.__delitem__, 'A')
+        self.assertFalse('A' in self.snapshot)
+        self.assertEqual(self.proxied._elements, {})
+
+
+class PullModulesTest(SnapshotTestCase):
+    def test_modules_fetched_without_existence_checks(self):
+        from exchange import Exchange
+        modules = dict(('Module{0}'.format(i), 'text') for i in range(10))
+        self.office.add_document('Doc', {'Standard': modules})
+        exchange = Exchange(find_uno=self.office.find_uno)
+        self.office.reset_counts()
+        pulled = list(exchange.pull_modules('Doc'))
+        self.assertEqual(len(pulled), 10)
+        module_container_calls = dict(
+            (method, count) for (cls, method), count
+            in self.office.calls.iteritems() if cls == 'FakeNameContainer')
+        self.assertEqual(module_container_calls,
+                         {'getElementNames': 1, 'getByName': 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
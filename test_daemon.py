@@ -0,0 +1,98 @@
+"""Tests of the daemon's socket permissions and of a client against it."""
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+
+import daemon
+from fake_uno import FakeOffice
+
+class SocketDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.runtime = os.environ.get('XDG_RUNTIME_DIR')
+
+    def tearDown(self):
+        if self.runtime is None:
+            os.environ.pop('XDG_RUNTIME_DIR', None)
+        else:
+            os.environ['XDG_RUNTIME_DIR'] = self.runtime
+        shutil.rmtree(self.directory)
+
+    def test_runtime_directory(self):
+        os.environ['XDG_RUNTIME_DIR'] = self.directory
+        self.assertEqual(daemon.default_socket_path(),
+                         os.path.join(self.directory, 'oomax',
+                                      'localhost-2002.sock'))
+
+    def test_temporary_directory(self):
+        os.environ.pop('XDG_RUNTIME_DIR', None)
+        self.assertEqual(os.path.dirname(daemon.default_socket_path()),
+                         os.path.join(tempfile.gettempdir(),
+                                      'oomax-{0}'.format(os.getuid())))
+
+    def test_private_directory_is_created(self):
+        path = os.path.join(self.directory, 'oomax')
+        daemon.make_private_directory(path)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0700)
+        # A second call accepts the directory.
+        daemon.make_private_directory(path)
+
+    def test_open_directory_is_refused(self):
+        path = os.path.join(self.directory, 'oomax')
+        os.mkdir(path)
+        os.chmod(path, 0755)
+        self.assertRaises(daemon.DaemonError,
+                          daemon.make_private_directory, path)
+
+    def test_symlink_is_refused(self):
+        path = os.path.join(self.directory, 'oomax')
+        os.symlink(self.directory, path)
+        self.assertRaises(daemon.DaemonError,
+                          daemon.make_private_directory, path)
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.sock')
+        self.office = FakeOffice()
+        self.office.add_document('Doc', {'Standard': {'Module1': u'text'}})
+        self.server = daemon.DaemonServer(self.path, daemon.ExchangeDaemon(
+            find_uno=self.office.find_uno))
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def test_socket_is_private(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0600)
+
+    def test_client(self):
+        client = daemon.connect_client(self.path)
+        try:
+            client.push('Doc', 'Standard', 'Module1', 'new\n')
+            self.assertEqual(client.pull_text('Doc', 'Standard', 'Module1'),
+                             'new')
+        finally:
+            client.close()
+
+    def test_no_daemon(self):
+        self.assertEqual(daemon.connect_client(self.path + '.missing'),
+                         None)
+
+    @unittest.skipUnless(os.getuid() == 0, "needs to change the owner")
+    def test_socket_of_another_user_is_refused(self):
+        os.lchown(self.path, 1, -1)
+        self.assertRaises(daemon.DaemonError, daemon.connect_client,
+                          self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
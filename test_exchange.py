@@ -0,0 +1,187 @@
+"""Tests of `exchange.Exchange` against a `fake_uno.FakeOffice`."""
+import unittest
+from cStringIO import StringIO
+
+from exchange import Exchange
+from fake_uno import FakeOffice
+import libraries, library
+
+class ExchangeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.office = FakeOffice()
+        self.office.add_document('Other', {'Standard': {'Module1': u'x'}})
+        self.doc = self.office.add_document('Doc', {'Standard': {
+            'Module1': u'sub main\nend sub',
+            'Module2': u'sub other\nend sub',
+        }})
+        self.exchange = Exchange(find_uno=self.office.find_uno)
+
+    def modules(self, library_name='Standard'):
+        return self.doc.libraries.modules(library_name)
+
+
+class PushTest(ExchangeTestCase):
+    def test_lines(self):
+        self.exchange.push('Doc', 'Standard', 'Module1', ['a\n', 'b\n'])
+        self.assertEqual(self.modules()['Module1'], 'a\nb')
+        self.assertTrue(self.doc.modified)
+        self.assertEqual(self.doc.store_count, 0)
+
+    def test_file_with_windows_line_endings(self):
+        self.exchange.push('Doc', 'Standard', 'Module1',
+                           StringIO('a\r\nb\r\n'), save=True)
+        self.assertEqual(self.modules()['Module1'], 'a\nb')
+        self.assertEqual(self.doc.store_count, 1)
+
+    def test_creates_library(self):
+        self.exchange.push('Doc', 'New', 'Module1', 'text\n')
+        self.assertEqual(self.modules('New'), {'Module1': 'text'})
+
+    def test_read_only_library(self):
+        self.doc.libraries.read_only.add('Standard')
+        self.assertRaises(library.ReadonlyLibraryError, self.exchange.push,
+                          'Doc', 'Standard', 'Module1', 'text')
+
+    def test_password_protected_library(self):
+        self.doc.libraries.passwords['Standard'] = 'secret'
+        self.assertRaises(libraries.PasswordProtectionError,
+                          self.exchange.push, 'Doc', 'Standard', 'Module1',
+                          'text')
+
+    def test_push_modules_saves_once(self):
+        timings = self.exchange.push_modules('Doc', [
+            ('Standard', 'Module1', 'one\n'),
+            ('Tools', 'Module1', 'two\n'),
+        ], save=True)
+        self.assertEqual([t[:2] for t in timings],
+                         [('Standard', 'Module1'), ('Tools', 'Module1')])
+        self.assertEqual(self.modules()['Module1'], 'one')
+        self.assertEqual(self.modules('Tools')['Module1'], 'two')
+        self.assertEqual(self.doc.store_count, 1)
+
+
+class PullTest(ExchangeTestCase):
+    def test_lines(self):
+        lines = self.exchange.pull('Doc', 'Standard', 'Module1')
+        self.assertEqual(list(lines), ['sub main\n', 'end sub\n'])
+
+    def test_text(self):
+        self.assertEqual(self.exchange.pull_text('Doc', 'Standard', 'Module2'),
+                         'sub other\nend sub')
+
+    def test_missing_module(self):
+        self.assertRaises(KeyError, self.exchange.pull_text,
+                          'Doc', 'Standard', 'Nope')
+
+    def test_pull_modules(self):
+        self.doc.libraries.passwords['Secret'] = 'pw'
+        self.doc.libraries.createLibrary('Secret')
+        self.assertEqual(sorted(self.exchange.pull_modules('Doc')), [
+            ('Standard', 'Module1', 'sub main\nend sub'),
+            ('Standard', 'Module2', 'sub other\nend sub'),
+        ])
+
+    def test_round_trip(self):
+        text = self.exchange.pull_text('Doc', 'Standard', 'Module1')
+        self.exchange.push('Doc', 'Standard', 'Module1',
+                           self.exchange.pull('Doc', 'Standard', 'Module1'))
+        self.assertEqual(self.modules()['Module1'], text)
+
+
+class InvokeTest(ExchangeTestCase):
+    def test_result_and_args(self):
+        self.office.macros['Standard.Module1.main'] = lambda a, b: a + b
+        self.assertEqual(self.exchange.invoke('Doc', 'Standard.Module1.main',
+                                              [1, 2]), 3)
+        self.assertEqual(self.doc.invocations,
+                         [('Standard.Module1.main', (1, 2))])
+
+    def test_scripts_are_kept(self):
+        self.exchange.invoke('Doc', 'Standard.Module1.main')
+        self.office.reset_counts()
+        self.exchange.invoke('Doc', 'Standard.Module1.main')
+        self.assertEqual(self.office.calls.get(
+            ('FakeScriptProvider', 'getScript')), None)
+
+    def test_invoke_many_carries_on(self):
+        results = list(self.exchange.invoke_many([
+            ('Doc', 'Standard.Module1.main', ()),
+            ('Doc', 'Standard.Missing.main', ()),
+            ('Nowhere', 'Standard.Module1.main', ()),
+            ('Doc', 'Standard.Module2.other', ()),
+        ]))
+        self.assertEqual([error is None for result, error, seconds in results],
+                         [True, False, False, True])
+
+
+class BatchTest(ExchangeTestCase):
+    def test_applies_together_and_saves_once(self):
+        with self.exchange.batch('Doc', save=True) as batch:
+            for i in range(5):
+                batch.push('Standard', 'New{0}'.format(i), 'text\n')
+            batch.delete('Standard', 'Module2')
+            batch.create_library('Empty')
+            # Nothing is applied until the block ends.
+            self.assertFalse('New0' in self.modules())
+        self.assertEqual(sorted(self.modules()),
+                         ['Module1', 'New0', 'New1', 'New2', 'New3', 'New4'])
+        self.assertEqual(self.modules('Empty'), {})
+        self.assertEqual(self.doc.store_count, 1)
+
+    def test_set_text_is_verbatim(self):
+        with self.exchange.batch('Doc') as batch:
+            batch.set_text('Standard', 'Module1', 'text\n\n')
+        self.assertEqual(self.modules()['Module1'], 'text\n\n')
+
+    def test_rolls_back_on_failure(self):
+        before = dict(self.modules())
+        try:
+            with self.exchange.batch('Doc', save=True) as batch:
+                batch.push('Standard', 'Module1', 'changed')
+                batch.push('Standard', 'Added', 'added')
+                batch.push('Created', 'Module1', 'created')
+                batch.delete('Standard', 'Missing')
+        except KeyError:
+            pass
+        else:
+            self.fail("KeyError not raised")
+        self.assertEqual(self.modules(), before)
+        self.assertFalse('Created' in self.doc.libraries._elements)
+        self.assertEqual(self.doc.store_count, 0)
+
+    def test_rolls_back_when_saving_fails(self):
+        def store():
+            raise IOError("disk full")
+        self.doc.store = store
+        before = dict(self.modules())
+        try:
+            with self.exchange.batch('Doc', save=True) as batch:
+                batch.push('Standard', 'Module1', 'new')
+                batch.push('Standard', 'Added', 'added')
+                batch.push('Created', 'Module1', 'created')
+        except IOError:
+            pass
+        else:
+            self.fail("IOError not raised")
+        self.assertEqual(self.modules(), before)
+        self.assertFalse('Created' in self.doc.libraries._elements)
+
+    def test_error_in_block_applies_nothing(self):
+        try:
+            with self.exchange.batch('Doc') as batch:
+                batch.push('Standard', 'Module1', 'changed')
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(self.modules()['Module1'], 'sub main\nend sub')
+        self.assertFalse(self.doc.modified)
+
+    def test_empty_batch_leaves_document_alone(self):
+        with self.exchange.batch('Doc', save=True):
+            pass
+        self.assertEqual(self.doc.store_count, 0)
+        self.assertFalse(self.doc.modified)
+
+
+if __name__ == '__main__':
+    unittest.main()
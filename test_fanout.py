@@ -0,0 +1,72 @@
+"""Tests of `fanout.fan_out`, with stand-ins for the exchanges."""
+import threading
+import time
+import unittest
+
+import fanout
+
+class FanOutTest(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.live = 0
+        self.most_live = 0
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def operation(self, target):
+        with self.lock:
+            self.live += 1
+            self.most_live = max(self.most_live, self.live)
+        try:
+            if target[0] == 'stuck':
+                self.release.wait(5)
+            else:
+                time.sleep(0.01)
+            return target[0]
+        finally:
+            with self.lock:
+                self.live -= 1
+
+    def fan_out(self, hosts, **kwargs):
+        return fanout.fan_out([(host, '2002') for host in hosts],
+                              self.operation,
+                              connect=lambda host, port: (host, port),
+                              **kwargs)
+
+    def test_results_in_order(self):
+        results = self.fan_out(['a', 'b', 'c', 'd'], max_workers=2)
+        self.assertEqual([result.result for result in results],
+                         ['a', 'b', 'c', 'd'])
+        self.assertTrue(all(result.error is None for result in results))
+        self.assertTrue(self.most_live <= 2)
+
+    def test_errors_are_recorded(self):
+        def connect(host, port):
+            raise IOError(host)
+        results = fanout.fan_out([('a', '2002')], self.operation,
+                                 connect=connect)
+        self.assertTrue(isinstance(results[0].error, IOError))
+
+    def test_abandoned_targets_hold_their_worker(self):
+        results = self.fan_out(['stuck', 'a', 'b', 'c'], max_workers=2,
+                               timeout=0.2)
+        self.assertTrue(isinstance(results[0].error,
+                                   fanout.TargetTimeoutError))
+        self.assertEqual([result.result for result in results[1:]],
+                         ['a', 'b', 'c'])
+        self.assertTrue(self.most_live <= 2)
+
+    def test_targets_left_when_every_worker_is_held_up(self):
+        results = self.fan_out(['stuck', 'stuck', 'a'], max_workers=2,
+                               timeout=0.1)
+        self.assertEqual(self.most_live, 2)
+        self.assertTrue(all(isinstance(result.error,
+                                       fanout.TargetTimeoutError)
+                            for result in results))
+        self.assertEqual(results[2].seconds, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
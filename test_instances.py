@@ -0,0 +1,100 @@
+"""Tests of `instances.InstanceManager`, with a stand-in for soffice."""
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from fake_uno import FakeOffice
+from instances import InstanceManager, InstanceError
+
+class InstanceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # Stays running, whatever options it is given, until terminated.
+        self.executable = os.path.join(self.directory, 'soffice')
+        with open(self.executable, 'w') as f:
+            f.write('#!/bin/sh\nexec sleep 60\n')
+        os.chmod(self.executable, stat.S_IRWXU)
+        self.office = FakeOffice()
+        self.office.add_document('Doc', {'Standard': {'Module1': u''}})
+        self.office.macros['Standard.Module1.double'] = lambda n: n * 2
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def manager(self, count=2, **kwargs):
+        kwargs.setdefault('find_uno', self.office.find_uno)
+        return InstanceManager(count, executable=self.executable,
+                               startup_timeout=5, **kwargs)
+
+    def assertStopped(self, manager, processes, base_dir):
+        self.assertEqual(manager.workers, [])
+        self.assertTrue(all(process.poll() is not None
+                            for process in processes))
+        self.assertFalse(os.path.exists(base_dir))
+
+
+class StartTest(InstanceTestCase):
+    def test_start_and_stop(self):
+        manager = self.manager(transport='socket')
+        with manager:
+            processes = [worker.process for worker in manager.workers]
+            base_dir = manager._base_dir
+            self.assertEqual(len(processes), 2)
+            self.assertTrue(all(worker.is_alive()
+                                for worker in manager.workers))
+            with manager.lease() as exchange:
+                self.assertEqual(exchange.invoke(
+                    'Doc', 'Standard.Module1.double', [2]), 4)
+        self.assertStopped(manager, processes, base_dir)
+
+    def test_failed_start_stops_every_worker(self):
+        def find_uno():
+            raise ImportError("no uno here")
+        manager = self.manager(count=3, find_uno=find_uno)
+        manager.startup_timeout = 0.3
+        launched = []
+        launch = manager._launch
+        def record_launch(worker):
+            launch(worker)
+            launched.append(worker)
+        manager._launch = record_launch
+        self.assertRaises(InstanceError, manager.__enter__)
+        self.assertEqual(len(launched), 3)
+        self.assertStopped(manager, [worker.process for worker in launched],
+                           os.path.dirname(launched[0].profile_dir))
+
+
+class LeaseTest(InstanceTestCase):
+    def test_killed_worker_is_restarted(self):
+        with self.manager(count=1) as manager:
+            worker = manager.workers[0]
+            killed = worker.process
+            killed.kill()
+            killed.wait()
+            with manager.lease(timeout=1) as exchange:
+                self.assertEqual(exchange.invoke(
+                    'Doc', 'Standard.Module1.double', [3]), 6)
+            self.assertEqual(worker.restarts, 1)
+            self.assertTrue(worker.process is not killed)
+            self.assertTrue(worker.is_alive())
+
+    def test_map(self):
+        with self.manager() as manager:
+            self.assertEqual(
+                manager.map(lambda exchange, n: exchange.invoke(
+                    'Doc', 'Standard.Module1.double', [n]), range(10)),
+                [n * 2 for n in range(10)])
+
+    def test_map_raises_first_error(self):
+        def fail(exchange, n):
+            if n == 3:
+                raise ValueError(n)
+            return n
+        with self.manager() as manager:
+            self.assertRaises(ValueError, manager.map, fail, range(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
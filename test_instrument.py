@@ -0,0 +1,39 @@
+"""Tests of `instrument.Recorder` against a `fake_uno.FakeOffice`."""
+import unittest
+
+from exchange import Exchange
+from fake_uno import FakeOffice
+from instrument import Recorder
+
+class RecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.office = FakeOffice()
+        self.office.add_document('Doc', {'Standard': {'Module1': u'x'}})
+        self.recorder = Recorder()
+        self.exchange = Exchange(find_uno=self.office.find_uno,
+                                 recorder=self.recorder)
+        self.office.reset_counts()
+        self.recorder.calls.clear()
+
+    def recorded(self):
+        return sum(count for count, seconds
+                   in self.recorder.calls.itervalues())
+
+    def test_property_reads_are_recorded(self):
+        self.exchange.pull_text('Doc', 'Standard', 'Module1')
+        self.assertEqual(self.office.calls[('FakeDocument',
+                                            'BasicLibraries')], 1)
+        self.assertEqual(self.recorder.calls[('Model', 'BasicLibraries')][0],
+                         1)
+
+    def test_every_round_trip_is_recorded(self):
+        self.exchange.push('Doc', 'Standard', 'Module1', 'y', save=True)
+        self.exchange.pull_text('Doc', 'Standard', 'Module1')
+        self.exchange.invoke('Doc', 'Standard.Module1.main')
+        self.assertEqual(self.recorded(), self.office.round_trips)
+        self.assertEqual(self.recorder.summary()['total_calls'],
+                         self.office.round_trips)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Tests of `macrobench` against a `fake_uno.FakeOffice`."""
+import unittest
+
+import macrobench
+from exchange import Exchange
+from fake_uno import FakeOffice
+
+class BenchVersionsTest(unittest.TestCase):
+    def setUp(self):
+        self.office = FakeOffice()
+        # Trailing blank lines,
+        # which a push would normalise away.
+        self.original = u'sub main\nend sub\n\n\n'
+        self.doc = self.office.add_document('Doc', {'Standard': {
+            'Module1': self.original}})
+        self.exchange = Exchange(find_uno=self.office.find_uno)
+
+    def test_original_restored_verbatim(self):
+        results = macrobench.bench_versions(
+            self.exchange, 'Doc', 'Standard.Module1.main',
+            [('one', 'sub main\nend sub\n'), ('two', ['sub main\n'])],
+            iterations=2, warmup=0)
+        self.assertEqual([label for label, summary in results],
+                         ['one', 'two'])
+        self.assertEqual(self.doc.libraries.modules('Standard')['Module1'],
+                         self.original)
+
+    def test_original_restored_after_failure(self):
+        def fail():
+            raise ValueError()
+        self.office.macros['Standard.Module1.main'] = fail
+        self.assertRaises(Exception, macrobench.bench_versions,
+                          self.exchange, 'Doc', 'Standard.Module1.main',
+                          [('one', 'changed\n')], iterations=1, warmup=0)
+        self.assertEqual(self.doc.libraries.modules('Standard')['Module1'],
+                         self.original)
+
+
+if __name__ == '__main__':
+    unittest.main()
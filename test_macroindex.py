@@ -0,0 +1,52 @@
+"""Tests of the offline macro index."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from macroindex import MacroIndex
+
+class GrepTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = MacroIndex(os.path.join(self.directory, 'index.json'))
+        self.index.replace([
+            (('Doc', 'Standard', 'A'), u'Sub Main\n  MsgBox "hi"\nEnd Sub'),
+            (('Doc', 'Standard', 'B'), u'Sub Other\n  x = 123\nEnd Sub'),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def grep(self, pattern, ignore_case=False):
+        return [(location[2], number) for location, number, line
+                in self.index.grep(pattern, ignore_case)]
+
+    def test_whole_word(self):
+        self.assertEqual(self.grep('MsgBox'), [('A', 2)])
+
+    def test_part_of_a_word(self):
+        self.assertEqual(self.grep('Msg'), [('A', 2)])
+        self.assertEqual(self.grep('Box'), [('A', 2)])
+
+    def test_digits(self):
+        self.assertEqual(self.grep('123'), [('B', 2)])
+        self.assertEqual(self.grep('23'), [('B', 2)])
+
+    def test_case(self):
+        self.assertEqual(self.grep('MSGBOX'), [])
+        self.assertEqual(self.grep('MSGBOX', ignore_case=True), [('A', 2)])
+
+    def test_regular_expression(self):
+        self.assertEqual(self.grep(r'^End\s'), [('A', 3), ('B', 3)])
+
+    def test_survives_saving(self):
+        self.index.save()
+        self.index = MacroIndex(self.index.path)
+        self.assertEqual(self.grep('Msg'), [('A', 2)])
+        self.assertEqual([location[2] for location, number, line
+                          in self.index.where_defined('other')], ['B'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Tests of snapshot archives, and of restoring them to a fake office."""
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import snapshot
+from exchange import Exchange
+from fake_uno import FakeOffice
+from snapshot import (Snapshot, SnapshotFormatError, restore_snapshot,
+                      take_snapshot, write_snapshot)
+
+modules = [
+    ('Standard', 'Module1', u"' Gr\xfc\xdfe\nsub main\nend sub\n\n"),
+    ('Standard', 'Empty', u''),
+    ('Tools', 'Module1', u'sub tool\nend sub'),
+]
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.oomax')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_bytes(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+
+class FormatTest(ArchiveTestCase):
+    def test_round_trip(self):
+        self.assertEqual(write_snapshot(self.path, modules, 'Doc'), 3)
+        with Snapshot(self.path) as archive:
+            self.assertEqual(archive.document, 'Doc')
+            self.assertEqual(len(archive), 3)
+            self.assertEqual(list(archive), modules)
+            self.assertEqual(archive.library_names(), ['Standard', 'Tools'])
+            self.assertEqual(archive.read('Tools', 'Module1'),
+                             u'sub tool\nend sub')
+            self.assertRaises(KeyError, archive.read, 'Tools', 'Missing')
+
+    def test_layout(self):
+        write_snapshot(self.path, modules, 'Doc')
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[:8], 'OOMAXSN1')
+        header_length, = struct.unpack('>I', data[8:12])
+        header = json.loads(data[12:12 + header_length])
+        body = data[12 + header_length:]
+        offset = 0
+        for (library_name, module_name, text), entry in zip(
+                modules, header['modules']):
+            encoded = text.encode('utf-8')
+            self.assertEqual(entry[:4], [library_name, module_name, offset,
+                                         len(encoded)])
+            self.assertEqual(body[offset:offset + len(encoded)], encoded)
+            offset += len(encoded)
+        self.assertEqual(offset, len(body))
+
+    def assertFormatError(self, data):
+        self.write_bytes(data)
+        self.assertRaises(SnapshotFormatError, Snapshot, self.path)
+
+    def test_empty_file(self):
+        self.assertFormatError('')
+
+    def test_bad_magic(self):
+        self.assertFormatError('NOTASNAP' + struct.pack('>I', 2) + '{}')
+
+    def header(self, text):
+        return snapshot.magic + struct.pack('>I', len(text)) + text
+
+    def test_corrupt_header(self):
+        self.assertFormatError(self.header('{"document": '))
+        self.assertFormatError(self.header('{"document": "Doc"}'))
+        self.assertFormatError(self.header(
+            '{"document": "Doc", "modules": [["Standard"]]}'))
+
+    def test_truncated(self):
+        write_snapshot(self.path, modules, 'Doc')
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertFormatError(data[:-1])
+        self.assertFormatError(data[:20])
+
+
+class RestoreTest(ArchiveTestCase):
+    def setUp(self):
+        ArchiveTestCase.setUp(self)
+        self.office = FakeOffice()
+        self.source = self.office.add_document('Template', {
+            'Standard': {'Module1': modules[0][2], 'Empty': u''},
+            'Tools': {'Module1': modules[2][2]},
+        })
+        self.doc = self.office.add_document('Doc', {'Standard': {
+            'Module1': modules[0][2], 'Other': u'kept'}})
+        self.exchange = Exchange(find_uno=self.office.find_uno)
+        take_snapshot(self.exchange, 'Template', self.path)
+
+    def test_restore(self):
+        restored = restore_snapshot(self.exchange, 'Doc', self.path,
+                                    save=True)
+        self.assertEqual(sorted(restored), [('Standard', 'Empty'),
+                                            ('Standard', 'Module1'),
+                                            ('Tools', 'Module1')])
+        self.assertEqual(self.doc.libraries.modules('Standard'), {
+            'Module1': modules[0][2], 'Empty': u'', 'Other': u'kept'})
+        self.assertEqual(self.doc.libraries.modules('Tools'),
+                         {'Module1': modules[2][2]})
+        self.assertEqual(self.doc.store_count, 1)
+
+    def test_changed_only(self):
+        restored = restore_snapshot(self.exchange, 'Doc', self.path,
+                                    save=True, only_changed=True)
+        self.assertEqual(sorted(restored), [('Standard', 'Empty'),
+                                            ('Tools', 'Module1')])
+        self.assertEqual(self.doc.store_count, 1)
+
+    def test_nothing_changed(self):
+        restore_snapshot(self.exchange, 'Doc', self.path)
+        self.doc.modified = False
+        self.assertEqual(restore_snapshot(self.exchange, 'Doc', self.path,
+                                          save=True, only_changed=True), [])
+        self.assertEqual(self.doc.store_count, 0)
+        self.assertFalse(self.doc.modified)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+"""Tests of converting between source files and module text."""
+import unittest
+from cStringIO import StringIO
+
+from sources import source_text, write_source
+
+class WriteSourceTest(unittest.TestCase):
+    def write(self, text, **kwargs):
+        f = StringIO()
+        write_source(text, f, **kwargs)
+        return f.getvalue()
+
+    def test_one_final_newline(self):
+        self.assertEqual(self.write('a\nb\n\n'), 'a\nb\n')
+        self.assertEqual(self.write(''), '\n')
+
+    def test_unicode_is_encoded(self):
+        self.assertEqual(self.write(u"' Gr\xfc\xdfe\nend"),
+                         "' Gr\xc3\xbc\xc3\x9fe\nend\n")
+
+    def test_slices_are_encoded_whole(self):
+        text = u'\xfc' * 10
+        self.assertEqual(self.write(text, chunk_size=3).decode('utf-8'),
+                         text + '\n')
+
+
+class SourceTextTest(unittest.TestCase):
+    def test_line_endings(self):
+        self.assertEqual(source_text('a\r\nb\rc\n'), 'a\nb\nc')
+        self.assertEqual(source_text(['a\n', 'b\n']), 'a\nb')
+
+
+if __name__ == '__main__':
+    unittest.main()
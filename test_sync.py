@@ -0,0 +1,121 @@
+"""Tests of `sync` and `manifest` against a `fake_uno.FakeOffice`."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import sync
+from exchange import Exchange
+from fake_uno import FakeOffice
+from manifest import Manifest, source_hash
+
+class SyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.office = FakeOffice()
+        self.doc = self.office.add_document('Doc', {'Standard': {
+            'Module1': u"' Gr\xfc\xdfe\nsub main\nend sub",
+            'Module2': u'sub other\nend sub',
+        }})
+        self.exchange = Exchange(find_uno=self.office.find_uno)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, library_name, module_name):
+        return sync.module_path(self.directory, library_name, module_name)
+
+    def read(self, library_name, module_name):
+        with open(self.path(library_name, module_name)) as f:
+            return f.read()
+
+    def write(self, library_name, module_name, data):
+        path = self.path(library_name, module_name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(data)
+
+    def modules(self, library_name='Standard'):
+        return self.doc.libraries.modules(library_name)
+
+
+class RoundTripTest(SyncTestCase):
+    def test_pull_writes_utf8(self):
+        timings = sync.sync_pull(self.exchange, 'Doc', self.directory)
+        self.assertEqual(sorted(t[:2] for t in timings),
+                         [('Standard', 'Module1'), ('Standard', 'Module2')])
+        self.assertEqual(self.read('Standard', 'Module1'),
+                         "' Gr\xc3\xbc\xc3\x9fe\nsub main\nend sub\n")
+
+    def test_push_reads_utf8(self):
+        self.write('Tools', 'Module1', "' \xc3\xa9t\xc3\xa9\r\n")
+        sync.sync_push(self.exchange, 'Doc', self.directory)
+        text = self.modules('Tools')['Module1']
+        self.assertTrue(isinstance(text, unicode))
+        self.assertEqual(text, u"' \xe9t\xe9")
+
+    def test_round_trip(self):
+        before = dict(self.modules())
+        sync.sync_pull(self.exchange, 'Doc', self.directory)
+        sync.sync_push(self.exchange, 'Doc', self.directory, save=True)
+        self.assertEqual(self.modules(), before)
+        self.assertEqual(self.doc.store_count, 1)
+
+
+class IncrementalTest(SyncTestCase):
+    def setUp(self):
+        SyncTestCase.setUp(self)
+        sync.sync_pull(self.exchange, 'Doc', self.directory)
+        sync.sync_push(self.exchange, 'Doc', self.directory,
+                       incremental=True)
+        self.doc.modified = False
+
+    def test_unchanged_tree_leaves_document_alone(self):
+        self.assertEqual(sync.sync_push(self.exchange, 'Doc',
+                                        self.directory, incremental=True),
+                         [])
+        self.assertFalse(self.doc.modified)
+
+    def test_only_changed_modules_are_pushed(self):
+        self.write('Standard', 'Module2', "' \xc3\xbc\n")
+        timings = sync.sync_push(self.exchange, 'Doc', self.directory,
+                                 incremental=True)
+        self.assertEqual([t[:2] for t in timings], [('Standard', 'Module2')])
+        self.assertEqual(self.modules()['Module2'], u"' \xfc")
+
+    def test_verify_pushes_drifted_modules(self):
+        self.doc.libraries.getByName('Standard').replaceByName(
+            'Module1', u'changed in the office')
+        self.assertEqual(sync.sync_push(self.exchange, 'Doc',
+                                        self.directory, incremental=True),
+                         [])
+        timings = sync.sync_push(self.exchange, 'Doc', self.directory,
+                                 incremental=True, verify=True)
+        self.assertEqual([t[:2] for t in timings], [('Standard', 'Module1')])
+        self.assertEqual(self.modules()['Module1'],
+                         u"' Gr\xfc\xdfe\nsub main\nend sub")
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'manifest')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_saved_and_loaded(self):
+        manifest = Manifest(self.path)
+        self.assertEqual(manifest.get('Doc', 'Standard', 'Module1'), None)
+        manifest.set('Doc', 'Standard', 'Module1', 'abc')
+        manifest.save()
+        self.assertEqual(Manifest(self.path).get('Doc', 'Standard',
+                                                 'Module1'), 'abc')
+
+    def test_hash_of_unicode_is_of_its_utf8(self):
+        self.assertEqual(source_hash(u'\xfc'), source_hash('\xc3\xbc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Tests of `watch.watch` against a `fake_uno.FakeOffice`."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import watch
+from exchange import Exchange
+from fake_uno import FakeOffice
+
+class ScriptedWatcher(object):
+    """Reports each of a list of path sets in turn, then interrupts."""
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def wait(self, timeout=None):
+        if timeout is not None:
+            # The delay after a change; nothing more arrives.
+            return set()
+        if not self.batches:
+            raise KeyboardInterrupt()
+        return self.batches.pop(0)
+
+    def close(self):
+        pass
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'Standard'))
+        self.office = FakeOffice()
+        self.doc = self.office.add_document('Doc', {'Standard': {}})
+        self.exchange = Exchange(find_uno=self.office.find_uno)
+        self.reports = []
+        self.errors = []
+        self.connections = 0
+        self.make_watcher = watch.make_watcher
+
+    def tearDown(self):
+        watch.make_watcher = self.make_watcher
+        shutil.rmtree(self.directory)
+
+    def write(self, module_name, text):
+        path = os.path.join(self.directory, 'Standard', module_name + '.bas')
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def reconnect(self):
+        self.connections += 1
+        return Exchange(find_uno=self.office.find_uno)
+
+    def watch(self, *batches):
+        watch.make_watcher = lambda directory: ScriptedWatcher(batches)
+        self.assertRaises(KeyboardInterrupt, watch.watch, self.exchange,
+                          'Doc', self.directory,
+                          report=self.reports.append,
+                          report_error=self.errors.append,
+                          reconnect=self.reconnect)
+
+    def modules(self):
+        return self.office.documents[0].libraries.modules('Standard')
+
+    def test_pushes_each_batch(self):
+        one = self.write('One', 'one\n')
+        two = self.write('Two', 'two\n')
+        self.watch(set([one, two]), set([os.path.join(self.directory,
+                                                      'notes.txt')]))
+        self.assertEqual(self.modules(), {'One': 'one', 'Two': 'two'})
+        self.assertEqual(len(self.reports), 1)
+        self.assertEqual(self.errors, [])
+
+    def test_files_are_utf8(self):
+        good = self.write('Good', "' \xc3\xbc\n")
+        bad = self.write('Bad', "' \xfc\n")
+        self.watch(set([bad]), set([good]))
+        self.assertEqual(len(self.errors), 1)
+        self.assertTrue(isinstance(self.errors[0], UnicodeDecodeError))
+        self.assertEqual(self.modules(), {'Good': u"' \xfc"})
+
+    def test_carries_on_after_a_failure(self):
+        path = self.write('One', 'one\n')
+        self.doc.libraries.read_only.add('Standard')
+        self.watch(set([path]), set([path]))
+        self.assertEqual(len(self.errors), 2)
+        self.assertEqual(self.reports, [])
+        self.assertEqual(self.connections, 0)
+
+        self.doc.libraries.read_only.clear()
+        self.watch(set([path]))
+        self.assertEqual(self.modules(), {'One': 'one'})
+        self.assertEqual(len(self.reports), 1)
+
+    def test_reconnects_after_restart(self):
+        path = self.write('One', 'one\n')
+        self.office.restart()
+        self.watch(set([path]), set([path]))
+        self.assertEqual(self.connections, 1)
+        self.assertEqual(self.errors, [])
+        self.assertEqual(len(self.reports), 2)
+        self.assertEqual(self.modules(), {'One': 'one'})
+
+
+if __name__ == '__main__':
+    unittest.main()
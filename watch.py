@@ -0,0 +1,197 @@
+"""Push modules to a document as their files change.
+
+The source tree is laid out as for `sync`.
+Changes are picked up with inotify where it is available
+and by polling file modification times elsewhere.
+Bursts of changes, such as those made by a `git checkout`,
+are collected into a single batch which is pushed over one connection.
+"""
+import os
+import select
+import struct
+import sys
+import time
+
+import connect, sync
+from sources import read_source_file
+
+class InotifyWatcher(object):
+    """Watches a source tree using the Linux inotify API via ctypes."""
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+    event_header = struct.Struct('iIII')
+
+    def __init__(self, directory):
+        import ctypes, ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                 use_errno=True)
+        self.fd = self._libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        self._dirs = {}
+        self._add(directory)
+        for name in os.listdir(directory):
+            if os.path.isdir(os.path.join(directory, name)):
+                self._add(os.path.join(directory, name))
+
+    def _add(self, path):
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        wd = self._libc.inotify_add_watch(self.fd, path, mask)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def wait(self, timeout=None):
+        """Returns the set of paths written within `timeout` seconds.
+
+        Waits indefinitely if `timeout` is None.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.event_header.unpack_from(data,
+                                                                     offset)
+            offset += self.event_header.size
+            name = data[offset:offset + length].rstrip('\0')
+            offset += length
+            if wd not in self._dirs:
+                continue
+            path = os.path.join(self._dirs[wd], name)
+            if mask & self.IN_ISDIR:
+                # A new library directory.
+                self._add(path)
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                paths.add(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher(object):
+    """Watches a source tree by comparing modification times."""
+    interval = 0.5
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._mtimes = self._scan()
+
+    def _scan(self):
+        mtimes = {}
+        for _, _, path in sync.read_tree(self.directory):
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    def wait(self, timeout=None):
+        """Returns the set of paths written within `timeout` seconds.
+
+        Waits indefinitely if `timeout` is None.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            mtimes = self._scan()
+            paths = set(path for path, mtime in mtimes.iteritems()
+                        if self._mtimes.get(path) != mtime)
+            self._mtimes = mtimes
+            if paths:
+                return paths
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return paths
+                time.sleep(min(self.interval, remaining))
+            else:
+                time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory):
+    """Returns an `InotifyWatcher` if possible, else a `PollingWatcher`."""
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError):
+        return PollingWatcher(directory)
+
+
+def modules_for(directory, paths):
+    """Maps changed `paths` to ``(library_name, module_name, source)``.
+
+    Files are read as UTF-8.
+    Paths outside the ``<Library>/<Module>.bas`` layout,
+    such as editor swap files, are ignored,
+    as are files which no longer exist.
+    """
+    for path in sorted(paths):
+        parts = os.path.relpath(path, directory).split(os.sep)
+        if len(parts) != 2:
+            continue
+        module_name, ext = os.path.splitext(parts[1])
+        if ext != sync.extension:
+            continue
+        try:
+            source = read_source_file(path)
+        except IOError:
+            continue
+        yield parts[0], module_name, source
+
+
+def report_error_to_stderr(e):
+    sys.stderr.write('Error: {0}\n'.format(e))
+    sys.stderr.flush()
+
+def watch(exchange, doc_name, directory, save=False, delay=0.2,
+          report=lambda timings: None, report_error=report_error_to_stderr,
+          reconnect=None):
+    """Pushes changed modules under `directory` to `doc_name` until interrupted.
+
+    After a change is seen, further changes are collected
+    until none have arrived for `delay` seconds.
+    The whole batch is then pushed with `Exchange.push_modules`,
+    and `report` is called with the resulting timings.
+
+    If a batch fails, `report_error` is called with the exception
+    and watching carries on.
+    If the bridge turns out to be dead, as when the office is restarted,
+    and `reconnect` is given, it is called for a fresh exchange
+    and the batch is retried once, as `daemon.ExchangeDaemon` does.
+    """
+    watcher = make_watcher(directory)
+    try:
+        while True:
+            paths = watcher.wait()
+            while True:
+                more = watcher.wait(delay)
+                if not more:
+                    break
+                paths |= more
+            try:
+                # A file which isn't UTF-8 is reported like a failed push.
+                modules = list(modules_for(directory, paths))
+                if not modules:
+                    continue
+                try:
+                    timings = exchange.push_modules(doc_name, modules,
+                                                    save=save)
+                except Exception:
+                    if (reconnect is None
+                            or connect.is_alive(exchange.context)):
+                        raise
+                    exchange = reconnect()
+                    timings = exchange.push_modules(doc_name, modules,
+                                                    save=save)
+            except Exception as e:
+                report_error(e)
+            else:
+                report(timings)
+    finally:
+        watcher.close()